@@ -1,17 +1,22 @@
 import os
 import uuid
 import json
+import hashlib
 import datetime
 import random
-import csv
-import re
+import sqlite3
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+import click
 from flask import (
     Flask, render_template, request, redirect,
-    url_for, session, flash, jsonify, Response
+    url_for, session, flash, jsonify, Response, stream_with_context
 )
+from utils import (
+    blobstore, export, ingest, jobs, passwords, pdf_text, question_bank, resume_parser,
+    scoring, storage
+)
+from utils.autosave import answer_hash, apply_update
+from utils.skill_matcher import SkillMatcher
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
@@ -22,27 +27,37 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # -------------------------------------------------------------------
-# JSON Data Manager
+# Data Store (SQLite, see utils/storage.py)
 # -------------------------------------------------------------------
 DATA_FILE = 'data.json'
-
-def load_data():
-    if not os.path.exists(DATA_FILE):
-        return {'users': {}, 'candidates': {}}
-    try:
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return {'users': {}, 'candidates': {}}
-
-def save_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+app.config['DATABASE'] = os.environ.get('SMARTHIRE_DB', 'smarthire.db')
+
+def init_storage():
+    """Open the database and import the legacy data.json on first run."""
+    storage.init_db(app.config['DATABASE'])
+    # Every gunicorn worker runs this; the lock makes sure only one imports
+    with storage.file_lock():
+        if storage.is_empty() and os.path.exists(DATA_FILE):
+            users, candidates, interviews = storage.migrate_from_json(DATA_FILE)
+            print(f"✅ Migrated {users} users, {candidates} candidates, {interviews} interviews from {DATA_FILE}")
+    # Uploaded files are deduplicated by content; unreferenced ones are swept
+    blobstore.init(os.path.join(app.config['UPLOAD_FOLDER'], 'blobs'))
+    blobstore.start_sweeper()
+
+init_storage()
+
+@app.before_request
+def start_background_threads():
+    """Threads don't survive a fork: workers forked after import (gunicorn
+    --preload) start their own sweeper and question watcher on their first request."""
+    blobstore.start_sweeper()
+    question_bank.start_watcher()
 
 # -------------------------------------------------------------------
-# Question Bank Loader
+# Question Bank (shared and lazily loaded, see utils/question_bank.py)
 # -------------------------------------------------------------------
-QUESTION_BANK = {}
+# Loads in the background and picks up edits to the CSV without a restart
+question_bank.start_watcher()
 
 # Comprehensive skills list for resume parsing
 SKILLS_DATABASE = [
@@ -118,163 +133,38 @@ SKILLS_DATABASE = [
     'direct indirect', 'error spotting'
 ]
 
-def load_questions_from_csv():
-    """Load questions from CSV file"""
-    global QUESTION_BANK
-    csv_path = 'interview_questions_complete.csv'
-    
-    if not os.path.exists(csv_path):
-        print(f"⚠️ CSV file not found. Please run generate_complete_csv.py first.")
-        # Create minimal default questions
-        QUESTION_BANK = {
-            'python': ['What is Python?', 'What are lists and tuples?'],
-            'java': ['What is JVM?', 'What is inheritance?'],
-            'javascript': ['What is closure?', 'What is event loop?'],
-            'html': ['What is HTML?', 'What are semantic tags?'],
-            'css': ['What is CSS box model?', 'What is flexbox?'],
-            'sql': ['What is JOIN?', 'What is primary key?'],
-            'leadership': ['How do you lead a team?', 'How do you handle conflicts?'],
-            'communication': ['How do you handle difficult conversations?'],
-            'problem_solving': ['How do you approach complex problems?'],
-            'teamwork': ['How do you handle team conflicts?'],
-            'percentages': ['What is 20% of 150?', 'If 30% of a number is 60, what is the number?'],
-            'averages': ['Find average of 5,10,15,20', 'The average of 4 numbers is 15.'],
-            'probability': ['What is probability of getting heads?']
-        }
-        return
-    
-    try:
-        with open(csv_path, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                topic = row['Topic'].strip().lower()
-                question = row['Question'].strip()
-                
-                if topic not in QUESTION_BANK:
-                    QUESTION_BANK[topic] = []
-                QUESTION_BANK[topic].append(question)
-        
-        print(f"✅ Loaded {sum(len(q) for q in QUESTION_BANK.values())} questions from CSV")
-    except Exception as e:
-        print(f"❌ Error loading CSV: {e}")
-
-# Load questions on startup
-load_questions_from_csv()
-
-# Smart skill → CSV topic mapper (fixes 0-questions bug)
-SKILL_TOPIC_MAP = {
-    'machine_learning': 'problem_solving_soft',
-    'machine learning': 'problem_solving_soft',
-    'deep_learning': 'problem_solving_soft',
-    'deep learning': 'problem_solving_soft',
-    'problem_solving': ['problem_solving_soft', 'problem_solving_mgmt'],
-    'problem solving': ['problem_solving_soft', 'problem_solving_mgmt'],
-    'critical_thinking': 'critical_thinking',
-    'critical thinking': 'critical_thinking',
-    'time_management': 'time_management',
-    'time management': 'time_management',
-    'teamwork': 'teamwork',
-    'leadership': 'leadership',
-    'communication': 'communication',
-    'adaptability': 'adaptability',
-    'emotional_intelligence': 'emotional_intelligence',
-    'emotional intelligence': 'emotional_intelligence',
-    'work_ethic': 'work_ethic',
-    'work ethic': 'work_ethic',
-    'creativity': 'creativity',
-    'negotiation': 'negotiation',
-    'stress_management': 'stress_management',
-    'stress management': 'stress_management',
-    'training': 'training_development',
-    'training_development': 'training_development',
-    'recruitment': 'recruitment',
-    'risk_management': 'risk_management',
-    'risk management': 'risk_management',
-    'project_management': 'project_management',
-    'project management': 'project_management',
-    'team_management': 'team_management',
-    'team management': 'team_management',
-    'strategic_planning': 'strategic_planning',
-    'strategic planning': 'strategic_planning',
-    'decision_making': 'decision_making',
-    'decision making': 'decision_making',
-    'conflict_resolution': 'conflict_resolution',
-    'conflict resolution': 'conflict_resolution',
-    'performance_management': 'performance_management',
-    'change_management': 'change_management',
-    'employee_relations': 'employee_relations',
-    'interpersonal_skills': 'interpersonal_skills',
-    'cultural_awareness': 'cultural_awareness',
-    'ethics': 'ethics',
-    'dependability': 'dependability',
-    'initiative': 'initiative',
-    'numpy': 'python',
-    'pandas': 'python',
-    'tensorflow': 'python',
-    'pytorch': 'python',
-    'keras': 'python',
-    'node': 'nodejs',
-    'express': 'express',
-    'c++': 'cpp',
-    'cpp': 'cpp',
-    'c#': 'csharp',
-    'csharp': 'csharp',
-    'r': None,  # too generic — skip
-}
+# Skill → topic resolution (see question_bank.topic_table) covers these names,
+# and the skill keys resume_parser assigns to candidates
+question_bank.register_skills(SKILLS_DATABASE)
+question_bank.register_skills(resume_parser._SKILLS)
 
-def _resolve_topics(skill):
-    """Map a skill name to its CSV topic(s). Returns list of valid topic keys."""
-    s = skill.lower().strip()
-    # Direct CSV key?
-    if s in QUESTION_BANK and QUESTION_BANK[s]:
-        return [s]
-    # Map lookup
-    mapped = SKILL_TOPIC_MAP.get(s)
-    if mapped is None and s in SKILL_TOPIC_MAP:
-        return []  # explicitly skipped
-    if mapped:
-        if isinstance(mapped, list):
-            return [t for t in mapped if t in QUESTION_BANK]
-        if mapped in QUESTION_BANK:
-            return [mapped]
-    # Try underscore ↔ space
-    for v in [s.replace(' ', '_'), s.replace('_', ' ')]:
-        if v in QUESTION_BANK and QUESTION_BANK[v]:
-            return [v]
-    return []
+# How many asked-question keys to remember per candidate (0 = no limit). Once
+# the window is full the oldest questions become eligible to be asked again.
+ASKED_HISTORY_LIMIT = int(os.environ.get('SMARTHIRE_ASKED_HISTORY', 0))
 
 # -------------------------------------------------------------------
 # Resume Parser Functions
 # -------------------------------------------------------------------
-def extract_text_from_pdf(filepath):
-    """Extract text from PDF file"""
+def extract_text_from_pdf(filepath, enough=None):
+    """Extract text from PDF file, within the page/char budget of utils/pdf_text.py ('' on failure)"""
     try:
-        import PyPDF2
-        text = ""
-        with open(filepath, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        return text.lower()
-    except:
-        # If PyPDF2 not installed or error, return filename as fallback
-        return os.path.basename(filepath).lower()
+        return pdf_text.extract_text(filepath, enough=enough).lower()
+    except Exception as e:
+        # PyPDF2 missing, not a PDF, or the pool failed: no text (never cached)
+        print(f"⚠️ Could not extract text from {os.path.basename(filepath)}: {e}")
+        return ''
+
+# Whole-word matcher over SKILLS_DATABASE, built once; maps each skill to its
+# ID format (spaces → underscores, c++ → cpp, c# → csharp)
+_SKILL_MATCHER = SkillMatcher(
+    (skill, skill.replace(' ', '_').replace('+', 'p').replace('#', 'sharp'), True)
+    for skill in SKILLS_DATABASE
+)
 
 def extract_skills_from_text(text):
     """Extract skills from text by matching against skills database"""
-    found_skills = []
-    text_lower = text.lower()
-    
-    for skill in SKILLS_DATABASE:
-        # Create pattern to match whole words
-        pattern = r'\b' + re.escape(skill) + r'\b'
-        if re.search(pattern, text_lower):
-            # Convert to consistent format (replace spaces with underscores for IDs)
-            skill_id = skill.replace(' ', '_').replace('+', 'p').replace('#', 'sharp')
-            found_skills.append(skill_id)
-    
-    # Remove duplicates
-    return list(set(found_skills))
+    # One pass over the text; unique skill IDs in SKILLS_DATABASE order
+    return _SKILL_MATCHER.find(text.lower())
 
 # -------------------------------------------------------------------
 # Auth Helpers
@@ -287,8 +177,7 @@ def login_required(role=None):
                 flash('Please log in first', 'warning')
                 return redirect(url_for('login'))
             if role:
-                data = load_data()
-                user = data['users'].get(session['user_id'])
+                user = storage.get_user(session['user_id'])
                 if not user or user['role'] != role:
                     flash('Unauthorized access', 'danger')
                     return redirect(url_for('dashboard'))
@@ -296,6 +185,21 @@ def login_required(role=None):
         return decorated_function
     return decorator
 
+CONFLICT_RETRIES = 3
+
+def retry_on_conflict(f):
+    """Re-run a route whose optimistic version check lost to a concurrent write."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        for attempt in range(CONFLICT_RETRIES):
+            try:
+                return f(*args, **kwargs)
+            except storage.ConflictError as e:
+                print(f"⚠️ {e} (attempt {attempt + 1}/{CONFLICT_RETRIES})")
+        flash('Your data was changed by another request. Please try again.', 'warning')
+        return redirect(url_for('dashboard'))
+    return decorated_function
+
 # -------------------------------------------------------------------
 # Routes
 # -------------------------------------------------------------------
@@ -315,30 +219,39 @@ def register():
             flash('All fields are required', 'danger')
             return redirect(url_for('register'))
 
-        data = load_data()
-        for u in data['users'].values():
-            if u['email'] == email:
-                flash('Email already registered', 'danger')
-                return redirect(url_for('register'))
+        if storage.get_user_by_email(email):
+            flash('Email already registered', 'danger')
+            return redirect(url_for('register'))
+
+        try:
+            password_hash = passwords.hash_password(password)
+        except passwords.Busy:
+            return _too_busy('register.html')
 
         user_id = str(uuid.uuid4())
-        data['users'][user_id] = {
+        user = {
             'id': user_id,
             'name': name,
             'email': email,
-            'password_hash': generate_password_hash(password),
+            'password_hash': password_hash,
             'role': role,
             'created_at': datetime.datetime.now().isoformat()
         }
-        if role == 'candidate':
-            data['candidates'][user_id] = {
-                'user_id': user_id,
-                'resume_text': '',
-                'skills': [],
-                'interviews': [],
-                'asked_questions': []
-            }
-        save_data(data)
+        try:
+            with storage.transaction():
+                storage.create_user(user)
+                if role == 'candidate':
+                    storage.create_candidate({
+                        'user_id': user_id,
+                        'resume_text': '',
+                        'skills': [],
+                        'interviews': [],
+                        'asked_questions': []
+                    })
+        except storage.DuplicateEmailError:
+            # Lost a race with a concurrent registration for the same email
+            flash('Email already registered', 'danger')
+            return redirect(url_for('register'))
         flash('Registration successful! Please login.', 'success')
         return redirect(url_for('login'))
     return render_template('register.html')
@@ -348,13 +261,12 @@ def login():
     if request.method == 'POST':
         email = request.form['email'].strip().lower()
         password = request.form['password']
-        data = load_data()
-        user = None
-        for u in data['users'].values():
-            if u['email'] == email:
-                user = u
-                break
-        if user and check_password_hash(user['password_hash'], password):
+        user = storage.get_user_by_email(email)
+        try:
+            valid = user is not None and passwords.check_password(user['password_hash'], password)
+        except passwords.Busy:
+            return _too_busy('login.html')
+        if valid:
             session['user_id'] = user['id']
             session['user_name'] = user['name']
             session['user_role'] = user['role']
@@ -363,6 +275,11 @@ def login():
         flash('Invalid email or password', 'danger')
     return render_template('login.html')
 
+def _too_busy(template):
+    """429 page for when password hashing is saturated (see utils/passwords.py)."""
+    flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'warning')
+    return render_template(template), 429, {'Retry-After': str(passwords.RETRY_AFTER)}
+
 @app.route('/logout')
 def logout():
     session.clear()
@@ -372,32 +289,31 @@ def logout():
 @app.route('/dashboard')
 @login_required()
 def dashboard():
-    data = load_data()
     user_id = session['user_id']
-    user = data['users'].get(user_id)
+    user = storage.get_user(user_id)
     
     if user['role'] == 'admin':
-        candidates = data['candidates']
         stats = {
-            'total_candidates': len(candidates),
-            'total_interviews': sum(len(c.get('interviews', [])) for c in candidates.values())
+            'total_candidates': storage.count_candidates(),
+            'total_interviews': storage.count_interviews()
         }
         return render_template('dashboard.html', role='admin', stats=stats)
     else:
-        candidate = data['candidates'].get(user_id, {'interviews': [], 'skills': []})
-        interviews = candidate.get('interviews', [])
-        avg_score = 0
-        if interviews:
-            avg_score = round(sum(iv['scores']['overall'] for iv in interviews) / len(interviews), 1)
+        candidate = storage.get_candidate(user_id, with_interviews=False) or {'skills': []}
+        # History table only needs each interview's question count, not its answers
+        candidate['interviews'] = storage.list_interviews(user_id, with_questions=False)
+        # Running totals kept by the store, no walk over the interviews
+        count = candidate.get('interview_count', 0)
         stats = {
-            'total_interviews': len(interviews),
-            'avg_score': avg_score
+            'total_interviews': count,
+            'avg_score': round(candidate['score_sum'] / count, 1) if count else 0
         }
         user_name = user.get('name', 'User')
         avatar_initials = ''.join(p[0].upper() for p in user_name.split()[:2])
         return render_template('dashboard.html', role='candidate', stats=stats,
                                candidate=candidate, user_name=user_name,
-                               avatar_initials=avatar_initials)
+                               avatar_initials=avatar_initials,
+                               resume_job_id=session.get('resume_job_id'))
 
 # ── File validation helpers (no external library needed) ─────────
 _FILE_SIGS = {
@@ -414,22 +330,13 @@ _RESUME_KW = [
     'declaration','frameworks','tools','languages','career'
 ]
 
-def _validate_resume_file(file, filename):
-    """Check extension, size, and magic bytes. Returns (ok, error_msg)."""
-    ext = filename.rsplit('.',1)[-1].lower() if '.' in filename else ''
-    if ext not in ('pdf','doc','docx'):
-        return False, 'Invalid file type. Please upload PDF, DOC, or DOCX only.'
-    file.seek(0, os.SEEK_END)
-    mb = file.tell() / (1024 * 1024)
-    file.seek(0)
-    if mb > 10:
-        return False, f'File too large ({mb:.1f} MB). Maximum allowed is 10 MB.'
-    header = file.read(8)
-    file.seek(0)
-    real_type = next((t for sig, t in _FILE_SIGS.items() if header.startswith(sig)), None)
-    if real_type is None:
-        return False, 'File format not recognised. Please upload a genuine PDF or Word document.'
-    return True, ''
+RESUME_MAX_BYTES = 10 * 1024 * 1024
+
+def _check_resume_header(header):
+    """Magic-bytes check on the first bytes of an upload. Returns an error message or ''."""
+    if not any(header.startswith(sig) for sig in _FILE_SIGS):
+        return 'File format not recognised. Please upload a genuine PDF or Word document.'
+    return ''
 
 def _text_is_resume(text):
     """Returns True if extracted text contains at least 3 resume keywords."""
@@ -438,6 +345,20 @@ def _text_is_resume(text):
     tl = text.lower()
     return sum(1 for kw in _RESUME_KW if kw in tl) >= 3
 
+RESUME_SKILL_LIMIT = 25
+RESUME_TEXT_LIMIT = 1500  # characters of resume text kept on the candidate
+
+# Tags cached parse results; anything that changes how a file is parsed must be
+# part of it so stale cache entries get recomputed
+RESUME_CACHE_VERSION = hashlib.sha1(json.dumps([
+    SKILLS_DATABASE, _RESUME_KW, RESUME_SKILL_LIMIT, RESUME_TEXT_LIMIT,
+    pdf_text.PDF_MAX_PAGES, pdf_text.PDF_MAX_CHARS,
+]).encode()).hexdigest()[:12]
+
+def _has_enough_resume_text(text):
+    """Early exit for PDF extraction: it's a resume and the skill list is already full."""
+    return _text_is_resume(text) and len(extract_skills_from_text(text)) >= RESUME_SKILL_LIMIT
+
 @app.route('/upload_resume', methods=['POST'])
 @login_required(role='candidate')
 def upload_resume():
@@ -449,69 +370,122 @@ def upload_resume():
     file = request.files['resume']
     original_name = file.filename
 
-    # Step 2 — extension, size, magic bytes
-    ok, err = _validate_resume_file(file, original_name)
-    if not ok:
-        flash(f'❌ {err}', 'danger')
+    # Step 2 — extension
+    ext = original_name.rsplit('.', 1)[-1].lower() if '.' in original_name else ''
+    if ext not in ('pdf', 'doc', 'docx'):
+        flash('❌ Invalid file type. Please upload PDF, DOC, or DOCX only.', 'danger')
         return redirect(url_for('dashboard'))
 
-    # Step 3 — save to disk
-    filename = secure_filename(f"{session['user_id']}_{original_name}")
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
+    # Step 3 — magic bytes, size, hash and write in one pass, then move into the
+    # content-addressed store (identical files share one blob)
+    tmp_path = blobstore.temp_path()
+    try:
+        digest, _ = ingest.stream_to_disk(file.stream, tmp_path, RESUME_MAX_BYTES,
+                                          _check_resume_header)
+    except ingest.UploadRejected as e:
+        flash(f'❌ {e}', 'danger')
+        return redirect(url_for('dashboard'))
+    filepath = blobstore.put(tmp_path, digest, ext)
+
+    # Steps 4–7 run in the background; the dashboard polls /resume_status
+    session['resume_job_id'] = jobs.submit('resume', session['user_id'], _process_resume,
+                                           session['user_id'], digest, filepath, original_name)
+    flash('📄 Resume uploaded — analysing it now...', 'info')
+    return redirect(url_for('dashboard'))
+
+def _process_resume(report, user_id, digest, filepath, original_name):
+    """Background job: extract text, check it is a resume, detect and save skills."""
+    # Identical files (re-uploads) reuse the cached result and skip PDF parsing
+    report('Checking for a previous upload', 5)
+    cached = storage.get_cached_resume(digest, RESUME_CACHE_VERSION)
+    if cached:
+        text, result = cached['text'], cached['output']
+    else:
+        text, result, extracted = _analyse_resume(report, filepath)
+        # "Could not read text" may be a passing failure (PDF pool, missing
+        # PyPDF2), so only results parsed from real text are cached
+        if extracted:
+            storage.put_cached_resume(digest, RESUME_CACHE_VERSION, text, result)
+
+    if result['skills'] is None:  # rejected: left unreferenced, the sweeper deletes it
+        return result
 
-    # Step 4 — extract text
-    text = extract_text_from_pdf(filepath)
+    # Step 7 — save
+    report('Saving', 90)
+    skills = result['skills']
+    with storage.transaction():
+        if not storage.get_candidate(user_id, with_interviews=False):
+            storage.create_candidate({
+                'user_id': user_id,
+                'resume_text': text,
+                'skills': skills,
+                'resume_filename': original_name,
+                'interviews': [],
+                'asked_questions': []
+            })
+        else:
+            storage.update_candidate(user_id, resume_text=text,
+                                     skills=skills, resume_filename=original_name)
+        storage.set_resume_blob(user_id, digest)
+    return result
+
+def _analyse_resume(report, filepath):
+    """
+    Steps 4–6 and the result message.
+    Returns (stored resume text, job result, whether text was extracted).
+    """
+    # Step 4 — extract text (stops reading pages once steps 5–6 have what they need)
+    report('Extracting text', 10)
+    text = extract_text_from_pdf(filepath, enough=_has_enough_resume_text)
     if not text or len(text.strip()) < 50:
-        try: os.remove(filepath)
-        except: pass
-        flash('❌ Could not read text from this file. It may be scanned, image-based, or password-protected. Please upload a text-based PDF.', 'danger')
-        return redirect(url_for('dashboard'))
+        return '', {'category': 'danger', 'skills': None,
+                    'message': '❌ Could not read text from this file. It may be scanned, image-based, or password-protected. Please upload a text-based PDF.'}, False
 
     # Step 5 — is it actually a resume?
+    report('Checking resume', 60)
     if not _text_is_resume(text):
-        try: os.remove(filepath)
-        except: pass
-        flash('❌ This file does not appear to be a resume. Please upload your actual CV/Resume — it should contain sections like Skills, Education, Experience, Projects.', 'danger')
-        return redirect(url_for('dashboard'))
+        return '', {'category': 'danger', 'skills': None,
+                    'message': '❌ This file does not appear to be a resume. Please upload your actual CV/Resume — it should contain sections like Skills, Education, Experience, Projects.'}, True
 
     # Step 6 — extract skills
-    skills = extract_skills_from_text(text)[:25]
-
-    # Step 7 — save
-    data = load_data()
-    candidate = data['candidates'].get(session['user_id'])
-    if not candidate:
-        data['candidates'][session['user_id']] = {
-            'user_id': session['user_id'],
-            'resume_text': text[:1500],
-            'skills': skills,
-            'resume_filename': original_name,
-            'interviews': [],
-            'asked_questions': []
-        }
-    else:
-        candidate['resume_text'] = text[:1500]
-        candidate['skills'] = skills
-        candidate['resume_filename'] = original_name
-    save_data(data)
-
-    session['has_resume'] = len(skills) > 0
+    report('Detecting skills', 75)
+    skills = extract_skills_from_text(text)[:RESUME_SKILL_LIMIT]
 
-    # Step 8 — flash result
+    # Step 8 — result message (flashed when the dashboard sees the job finish)
     if skills:
         preview = ', '.join(skills[:6])
-        flash(f'✅ Resume verified and uploaded! Found {len(skills)} skills: {preview}{"..." if len(skills) > 6 else "."}', 'success')
-    else:
-        flash('✅ Resume verified! No skills auto-detected — you can select topics manually on the Configure Interview page.', 'info')
+        message = f'✅ Resume verified and uploaded! Found {len(skills)} skills: {preview}{"..." if len(skills) > 6 else "."}'
+        return text[:RESUME_TEXT_LIMIT], {'category': 'success', 'skills': skills, 'message': message}, True
+    return text[:RESUME_TEXT_LIMIT], {'category': 'info', 'skills': skills,
+            'message': '✅ Resume verified! No skills auto-detected — you can select topics manually on the Configure Interview page.'}, True
 
-    return redirect(url_for('dashboard'))
+@app.route('/resume_status/<job_id>')
+@login_required(role='candidate')
+def resume_status(job_id):
+    """Poll a resume processing job; flashes the outcome once it has finished."""
+    job = jobs.get_status(job_id)
+    if not job or job['user_id'] != session['user_id']:
+        if session.get('resume_job_id') == job_id:
+            session.pop('resume_job_id', None)
+        return jsonify({'error': 'Job not found'}), 404
+
+    finished = job['status'] in ('done', 'failed')
+    if finished and session.get('resume_job_id') == job_id:
+        session.pop('resume_job_id', None)
+        if job['status'] == 'done':
+            flash(job['output']['message'], job['output']['category'])
+            if job['output']['skills'] is not None:
+                session['has_resume'] = len(job['output']['skills']) > 0
+        else:
+            flash('❌ Something went wrong while reading your resume. Please try uploading it again.', 'danger')
+
+    return jsonify({'status': job['status'], 'stage': job['stage'],
+                    'progress': job['progress'], 'finished': finished})
 
 @app.route('/configure-interview')
 @login_required(role='candidate')
 def configure_interview():
-    data = load_data()
-    candidate = data['candidates'].get(session['user_id'], {})
+    candidate = storage.get_candidate(session['user_id'], with_interviews=False) or {}
     resume_skills = candidate.get('skills', [])
     
     # Pass both resume_skills and a flag indicating if resume exists
@@ -521,9 +495,9 @@ def configure_interview():
 
 @app.route('/start_interview', methods=['POST'])
 @login_required(role='candidate')
+@retry_on_conflict
 def start_interview():
-    data = load_data()
-    candidate = data['candidates'].get(session['user_id'])
+    candidate = storage.get_candidate(session['user_id'], with_interviews=False)
     
     if not candidate:
         flash('Candidate profile not found', 'danger')
@@ -556,29 +530,27 @@ def start_interview():
     
     # Generate questions from bank
     questions = []
-    used = set(candidate.get('asked_questions', []))
+    index = question_bank.get_index()
+    used = _asked_bitset(candidate, index)
+    asked_ids = []
     
     for skill, count in selected_skills.items():
-        topics = _resolve_topics(skill)
+        topics = question_bank.resolve_topics(skill, index)
         if topics:
-            # Gather pool from all resolved topics
-            pool = []
-            for topic in topics:
-                pool.extend(QUESTION_BANK.get(topic, []))
-            available = [q for q in pool if q not in used]
-            random.shuffle(available)
-            if len(available) >= count:
-                picked = available[:count]
-            else:
-                picked = available[:]
+            ids = index.sample(topics, count, used)
+            picked = index.texts(ids)
+            if len(picked) < count:
+                # Candidate has seen the whole pool: repeat from the start of it
+                pool = index.texts(index.pool(topics))
                 remaining = count - len(picked)
                 for i in range(remaining):
                     picked.append(pool[i % len(pool)] if pool else f"Describe your experience with {skill.replace('_',' ')}.")
             questions.extend(picked)
-            used.update(picked)
+            asked_ids.extend(ids)
+            for qid in ids:
+                used |= 1 << qid
             print(f"✅ Added {count} questions for '{skill}' → topics: {topics}")
         else:
-            print(f"⚠️ No CSV topic for '{skill}', using generic questions")
             label = skill.replace('_', ' ').title()
             fallbacks = [
                 f"Describe your experience with {label}.",
@@ -596,7 +568,10 @@ def start_interview():
     print(f"\n📝 Total questions generated: {len(questions)}")
     
     # Save to candidate
-    candidate.setdefault('asked_questions', []).extend(questions)
+    asked_questions = candidate.get('asked_questions', []) + index.keys(asked_ids)
+    if ASKED_HISTORY_LIMIT and len(asked_questions) > ASKED_HISTORY_LIMIT:
+        asked_questions = asked_questions[-ASKED_HISTORY_LIMIT:]
+        used = index.bitset(asked_questions)
     
     interview_id = str(uuid.uuid4())
     interview = {
@@ -610,8 +585,11 @@ def start_interview():
         'duration_seconds': 0
     }
     
-    candidate['interviews'].append(interview)
-    save_data(data)
+    with storage.transaction():
+        storage.update_candidate(session['user_id'], expected_version=candidate['version'],
+                                 asked_questions=asked_questions,
+                                 asked_bits=f'{used:x}', asked_bank=index.version)
+        storage.add_interview(session['user_id'], interview)
     
     session['current_interview_id'] = interview_id
     session['interview_start_time'] = datetime.datetime.now().isoformat()
@@ -619,6 +597,12 @@ def start_interview():
     flash(f'🎯 Interview started with {len(questions)} questions! Good luck!', 'success')
     return redirect(url_for('interview'))
 
+def _asked_bitset(candidate, index):
+    """The candidate's asked set as a bitset over `index`, rebuilt if the bank changed."""
+    if candidate.get('asked_bank') == index.version and candidate.get('asked_bits'):
+        return int(candidate['asked_bits'], 16)
+    return index.bitset(candidate.get('asked_questions', []))
+
 @app.route('/interview')
 @login_required(role='candidate')
 def interview():
@@ -627,18 +611,7 @@ def interview():
         flash('No active interview', 'warning')
         return redirect(url_for('dashboard'))
 
-    data = load_data()
-    candidate = data['candidates'].get(session['user_id'])
-    if not candidate:
-        flash('Candidate not found', 'danger')
-        return redirect(url_for('dashboard'))
-
-    interview = None
-    for iv in candidate.get('interviews', []):
-        if iv['id'] == interview_id:
-            interview = iv
-            break
-    
+    interview = storage.get_interview(interview_id, candidate_id=session['user_id'])
     if not interview:
         flash('Interview not found', 'danger')
         return redirect(url_for('dashboard'))
@@ -648,47 +621,80 @@ def interview():
 @app.route('/save_answer', methods=['POST'])
 @login_required(role='candidate')
 def save_answer():
-    data = load_data()
-    candidate = data['candidates'].get(session['user_id'])
-    if not candidate:
-        return jsonify({'error': 'Candidate not found'}), 404
-
     interview_id = session.get('current_interview_id')
-    interview = None
-    for iv in candidate.get('interviews', []):
-        if iv['id'] == interview_id:
-            interview = iv
-            break
-    
-    if not interview:
+    owner, _ = storage.locate_interview(interview_id)
+    if not interview_id or owner != session['user_id']:
         return jsonify({'error': 'Interview not found'}), 404
 
     q_index = int(request.form.get('q_index', 0))
     answer = request.form.get('answer', '').strip()
 
-    if 0 <= q_index < len(interview['questions']):
-        interview['questions'][q_index]['answer'] = answer
-        save_data(data)
-        return jsonify({'status': 'ok'})
-    
-    return jsonify({'error': 'Invalid question index'}), 400
+    questions = storage.get_question_texts(interview_id, [q_index])
+    if not questions:
+        return jsonify({'error': 'Invalid question index'}), 400
+
+    scores = _score_saved_answers(interview_id, {q_index: answer}, questions)
+    storage.set_answers(interview_id, {q_index: answer}, scores)
+    return jsonify({'status': 'ok'})
+
+def _score_saved_answers(interview_id, answers, questions=None):
+    """
+    Score answers before they are saved so submit only aggregates. Returns the
+    score rows to write with the answers; never fails the save.
+    """
+    try:
+        return scoring.score_answers(interview_id, answers, questions)
+    except (sqlite3.Error, ArithmeticError, TypeError, ValueError) as e:
+        print(f"⚠️ Could not pre-score answers for {interview_id}: {e}")
+        return []
+
+@app.route('/save_answers', methods=['POST'])
+@login_required(role='candidate')
+def save_answers():
+    """Batched autosave: several answers per request, as full text or deltas (utils/autosave.py)"""
+    interview_id = session.get('current_interview_id')
+    owner, _ = storage.locate_interview(interview_id)
+    if not interview_id or owner != session['user_id']:
+        return jsonify({'error': 'Interview not found'}), 404
+
+    updates = (request.get_json(silent=True) or {}).get('answers')
+    if not isinstance(updates, list):
+        return jsonify({'error': 'Expected a list of answers'}), 400
+
+    questions = storage.get_interview(interview_id)['questions']
+    current = [q['answer'] for q in questions]
+    changed, hashes, resync = {}, {}, []
+    for update in updates:
+        try:
+            q_index = int(update['q_index'])
+        except (TypeError, KeyError, ValueError):
+            return jsonify({'error': 'Invalid question index'}), 400
+        if not 0 <= q_index < len(current):
+            return jsonify({'error': 'Invalid question index'}), 400
+
+        text = apply_update(changed.get(q_index, current[q_index]), update)
+        if text is None:
+            resync.append(q_index)
+            continue
+        if text != current[q_index]:
+            changed[q_index] = text
+        else:
+            changed.pop(q_index, None)
+        hashes[q_index] = answer_hash(text)
+
+    scores = _score_saved_answers(interview_id, changed,
+                                  {i: questions[i]['question'] for i in changed})
+    storage.set_answers(interview_id, changed, scores)
+    return jsonify({'status': 'ok', 'saved': sorted(changed), 'hashes': hashes, 'resync': resync})
 
 @app.route('/submit_interview', methods=['POST'])
 @login_required(role='candidate')
+@retry_on_conflict
 def submit_interview():
-    data = load_data()
-    candidate = data['candidates'].get(session['user_id'])
-    if not candidate:
-        flash('Candidate not found', 'danger')
-        return redirect(url_for('dashboard'))
-
     interview_id = session.get('current_interview_id')
-    interview = None
-    for iv in candidate.get('interviews', []):
-        if iv['id'] == interview_id:
-            interview = iv
-            break
-    
+    if interview_id:
+        storage.compact_journal(interview_id)  # fold pending autosaves before scoring
+    interview = storage.get_interview(interview_id, candidate_id=session['user_id'])
     if not interview:
         flash('Interview not found', 'danger')
         return redirect(url_for('dashboard'))
@@ -699,92 +705,11 @@ def submit_interview():
         duration = int((datetime.datetime.now() - start).total_seconds())
         interview['duration_seconds'] = duration
 
-    # Evaluate answers
-    questions = interview['questions']
-    tech_scores = []
-    comm_scores = []
-    per_question = []
-    
-    for q in questions:
-        answer = q.get('answer', '').strip()
-        if answer:
-            word_count = len(answer.split())
-            # Technical score based on length and keyword matching
-            q_words = set(q['question'].lower().split())
-            a_words = set(answer.lower().split())
-            overlap = len(q_words & a_words)
-            tech = min(100, word_count * 4 + overlap * 5)
-            # Communication score based on length and structure
-            comm = min(100, word_count * 3 + (10 if '.' in answer else 0) + (10 if ',' in answer else 0))
-        else:
-            tech, comm = 0, 0
-        
-        tech_scores.append(min(100, tech))
-        comm_scores.append(min(100, comm))
-        
-        # Generate feedback
-        if not answer:
-            feedback = "❌ No answer provided. Always attempt every question."
-        elif word_count < 15:
-            feedback = "⚠️ Very brief answer. Add more details and examples."
-        elif word_count < 30:
-            feedback = "📝 Good start. Could include more specific examples."
-        elif word_count < 60:
-            feedback = "✅ Good answer. Well structured."
-        else:
-            feedback = "🌟 Excellent answer! Detailed and well explained."
-        
-        per_question.append({
-            'technical_score': round(min(100, tech), 1),
-            'communication_score': round(min(100, comm), 1),
-            'feedback': feedback
-        })
-    
-    avg_tech = round(sum(tech_scores) / len(tech_scores), 1) if tech_scores else 0
-    avg_comm = round(sum(comm_scores) / len(comm_scores), 1) if comm_scores else 0
-    overall = round((avg_tech * 0.6 + avg_comm * 0.4), 1)
-    
-    interview['scores'] = {
-        'technical': avg_tech,
-        'communication': avg_comm,
-        'overall': overall,
-        'per_question': per_question
-    }
-    
-    answered = sum(1 for q in questions if q.get('answer', '').strip())
-    
-    # Generate summary feedback
-    feedback_lines = [
-        f"✅ You answered {answered}/{len(questions)} questions.",
-        f"📊 Overall Score: {overall}%",
-        "",
-        "📈 Performance Summary:"
-    ]
-    
-    if avg_tech < 50:
-        feedback_lines.append("• Technical knowledge needs improvement. Review core concepts.")
-    else:
-        feedback_lines.append("• Good technical understanding demonstrated.")
-    
-    if avg_comm < 50:
-        feedback_lines.append("• Work on structuring answers with more clarity.")
-    else:
-        feedback_lines.append("• Clear communication style.")
-    
-    if answered < len(questions):
-        feedback_lines.append(f"• {len(questions) - answered} questions left unanswered.")
-    
-    feedback_lines.append("")
-    feedback_lines.append("📝 Detailed Feedback:")
-    
-    for i, pq in enumerate(per_question):
-        status = "✓" if questions[i].get('answer', '').strip() else "✗"
-        feedback_lines.append(f"Q{i+1} {status} [Tech: {pq['technical_score']}% | Comm: {pq['communication_score']}%]: {pq['feedback']}")
-    
-    interview['feedback'] = "\n".join(feedback_lines)
-    interview['result'] = 'selected' if overall >= 60 else 'rejected'
-    
-    save_data(data)
+    # Scoring runs in the background (utils/scoring.py); results shows progress
+    storage.update_interview(interview_id, expected_version=interview['version'],
+                             result='scoring',
+                             duration_seconds=interview['duration_seconds'])
+    scoring.submit(interview_id, session['user_id'])
     
     session.pop('current_interview_id', None)
     session.pop('interview_start_time', None)
@@ -795,119 +720,140 @@ def submit_interview():
 @app.route('/results/<interview_id>')
 @login_required()
 def results(interview_id):
-    data = load_data()
     user_id = session['user_id']
-    user = data['users'].get(user_id)
+    user = storage.get_user(user_id)
 
     interview = None
     candidate_name = user['name']
 
     if user['role'] == 'admin':
-        for cid, cand in data['candidates'].items():
-            for iv in cand.get('interviews', []):
-                if iv['id'] == interview_id:
-                    interview = iv
-                    candidate_name = data['users'].get(cid, {}).get('name', 'Candidate')
-                    break
-            if interview:
-                break
+        owner_id, _ = storage.locate_interview(interview_id)
+        if owner_id:
+            interview = storage.get_interview(interview_id)
+            candidate_name = (storage.get_user(owner_id) or {}).get('name', 'Candidate')
     else:
-        candidate = data['candidates'].get(user_id, {})
-        for iv in candidate.get('interviews', []):
-            if iv['id'] == interview_id:
-                interview = iv
-                break
+        interview = storage.get_interview(interview_id, candidate_id=user_id)
 
     if not interview:
         flash('Interview not found', 'danger')
         return redirect(url_for('dashboard'))
 
     first_name = candidate_name.split()[0] if candidate_name else 'Candidate'
+    state = scoring.status(interview)
+    if state == 'failed':
+        scoring.submit(interview_id, user_id)  # worker died or scorer raised: try again
+    if state != 'done':
+        return render_template('scoring.html', interview=interview, first_name=first_name)
+    if interview['result'] == 'scoring':  # finished since it was read
+        interview = storage.get_interview(interview_id)
     return render_template('results.html', interview=interview,
                            candidate_name=candidate_name, first_name=first_name)
 
+@app.route('/scoring_status/<interview_id>')
+@login_required()
+def scoring_status(interview_id):
+    """Poll background scoring of a submitted interview."""
+    user = storage.get_user(session['user_id'])
+    owner_id, _ = storage.locate_interview(interview_id)
+    if not owner_id or (user['role'] != 'admin' and owner_id != user['id']):
+        return jsonify({'error': 'Interview not found'}), 404
+    return jsonify({'status': scoring.status(storage.get_interview(interview_id))})
+
+ADMIN_PAGE_SIZE = 50
+
 @app.route('/admin')
 @login_required(role='admin')
 def admin_panel():
-    data = load_data()
-    candidates_list = []
-    
-    for uid, user in data['users'].items():
-        if user['role'] == 'candidate':
-            cand = data['candidates'].get(uid, {})
-            interviews = cand.get('interviews', [])
-            last = interviews[-1] if interviews else None
-            candidates_list.append({
-                'id': uid,
-                'name': user['name'],
-                'email': user['email'],
-                'skills': cand.get('skills', [])[:5],  # Show first 5 skills
-                'total_interviews': len(interviews),
-                'last_score': last['scores']['overall'] if last else 'N/A',
-                'result': last['result'] if last else 'N/A',
-                'interview_id': last['id'] if last else None
-            })
-    
-    return render_template('admin.html', candidates=candidates_list)
+    search = request.args.get('q', '').strip()
+    sort = request.args.get('sort', 'date')
+    if sort not in ('name', 'score', 'date', 'interviews'):
+        sort = 'date'
+    descending = request.args.get('order', 'asc' if sort == 'name' else 'desc') == 'desc'
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    # Only the rows on this page are read; sort keys and search are indexed
+    rows, total = storage.list_candidate_page(search=search or None, sort=sort,
+                                              descending=descending, limit=ADMIN_PAGE_SIZE,
+                                              offset=(page - 1) * ADMIN_PAGE_SIZE)
+    candidates_list = [{
+        'id': row['id'],
+        'name': row['name'],
+        'email': row['email'],
+        'skills': row['skills'][:5],  # Show first 5 skills
+        'total_interviews': row['interview_count'],
+        'last_score': (row['last_score'] or 0) if row['last_interview_id'] else 'N/A',
+        'result': row['last_result'] if row['last_interview_id'] else 'N/A',
+        'interview_id': row['last_interview_id']
+    } for row in rows]
+
+    pages = max((total + ADMIN_PAGE_SIZE - 1) // ADMIN_PAGE_SIZE, 1)
+    return render_template('admin.html', candidates=candidates_list, total=total,
+                           page=page, pages=pages, search=search, sort=sort,
+                           order='desc' if descending else 'asc')
+
+@app.route('/admin/hashing_metrics')
+@login_required(role='admin')
+def hashing_metrics():
+    """Password hashing pool counters for the worker serving this request."""
+    return jsonify(passwords.metrics())
 
 @app.route('/delete_candidate/<user_id>', methods=['POST'])
 @login_required(role='admin')
 def delete_candidate(user_id):
-    data = load_data()
-    if user_id in data['users'] and data['users'][user_id]['role'] == 'candidate':
-        del data['users'][user_id]
-        data['candidates'].pop(user_id, None)
-        save_data(data)
+    user = storage.get_user(user_id)
+    if user and user['role'] == 'candidate':
+        storage.delete_user(user_id)
         flash('Candidate deleted successfully', 'success')
     return redirect(url_for('admin_panel'))
 
 @app.route('/export_results')
 @login_required(role='admin')
 def export_results():
-    import csv
-    import io
-
-    data = load_data()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Name', 'Email', 'Date', 'Score', 'Result', 'Duration (min)'])
-
-    for uid, user in data['users'].items():
-        if user['role'] == 'candidate':
-            cand = data['candidates'].get(uid, {})
-            for iv in cand.get('interviews', []):
-                writer.writerow([
-                    user['name'],
-                    user['email'],
-                    iv['date'][:10],
-                    iv['scores']['overall'],
-                    iv['result'],
-                    iv.get('duration_seconds', 0)//60
-                ])
-
+    """Stream interview results (see utils/export.py for formats, filters and cursors)"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return jsonify({'error': f'Unknown format: {fmt}'}), 400
+    try:
+        filters = export.parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 0:
+        return jsonify({'error': 'limit must not be negative'}), 400
+
+    mimetype, extension = export.FORMATS[fmt]
     return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=smarthire_results.csv'}
+        stream_with_context(export.stream(fmt, filters, limit)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=smarthire_results.{extension}'}
     )
+
 @app.route('/remove_resume', methods=['POST'])
 @login_required(role='candidate')
 def remove_resume():
     """Remove uploaded resume and clear skills"""
-    data = load_data()
-    candidate = data['candidates'].get(session['user_id'])
+    candidate = storage.get_candidate(session['user_id'], with_interviews=False)
     
     if candidate:
-        # Clear resume data
-        candidate['resume_text'] = ''
-        candidate['skills'] = []
-        save_data(data)
+        # Clear resume data and release the uploaded file
+        with storage.transaction():
+            storage.update_candidate(session['user_id'], resume_text='', skills=[])
+            storage.set_resume_blob(session['user_id'], None)
         flash('Resume removed successfully. You can upload a new one anytime.', 'success')
     else:
         flash('Candidate not found', 'danger')
     
     return redirect(url_for('dashboard'))
 
+@app.cli.command('rescore')
+@click.option('--batch-size', default=500, show_default=True, help='Interviews per transaction.')
+def rescore_command(batch_size):
+    """Re-score every submitted interview with the current scoring formula."""
+    started = datetime.datetime.now()
+    total = scoring.rescore_all(batch_size, progress=lambda n: print(f"  ... {n} interviews", end='\r'))
+    seconds = (datetime.datetime.now() - started).total_seconds()
+    print(f"✅ Re-scored {total} interviews in {seconds:.1f}s")
+
 if __name__ == '__main__':
     # Check if PyPDF2 is installed
     try:
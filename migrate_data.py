@@ -0,0 +1,23 @@
+import os
+import sys
+from utils import storage
+
+def migrate_data(json_path='data.json', db_path='smarthire.db'):
+    """One-shot import of data.json into the SQLite store"""
+    if not os.path.exists(json_path):
+        print(f"⚠️ {json_path} not found, nothing to migrate")
+        return
+
+    storage.init_db(db_path)
+    if not storage.is_empty():
+        print(f"⚠️ {db_path} already contains data, refusing to migrate twice")
+        return
+
+    users, candidates, interviews = storage.migrate_from_json(json_path)
+    print(f"✅ Migrated {json_path} → {db_path}")
+    print(f"   - Users: {users}")
+    print(f"   - Candidates: {candidates}")
+    print(f"   - Interviews: {interviews}")
+
+if __name__ == "__main__":
+    migrate_data(*sys.argv[1:3])
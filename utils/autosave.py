@@ -0,0 +1,52 @@
+"""
+autosave.py - Hash and delta helpers for the batched /save_answers endpoint
+
+The interview page keeps, per question, the text it last saved. On the next
+flush it sends either the full answer or a single-span delta against that
+text, tagged with hashes so the server can tell when the two sides disagree.
+
+    {"q_index": 3, "answer": "full text"}
+    {"q_index": 3, "base": "<hash>", "hash": "<hash>",
+     "delta": {"at": 120, "remove": 0, "insert": " more words"}}
+
+Positions count Unicode code points (Array.from() in the browser, str
+indexing in Python), so both sides agree on non-ASCII text. The hash is
+32-bit FNV-1a over the UTF-8 bytes; templates/interview.html has the same
+function in JavaScript.
+"""
+
+FNV_OFFSET = 0x811c9dc5
+FNV_PRIME = 0x01000193
+
+
+def answer_hash(text):
+    """32-bit FNV-1a of the UTF-8 encoded text, as 8 hex digits."""
+    h = FNV_OFFSET
+    for b in text.encode('utf-8'):
+        h = ((h ^ b) * FNV_PRIME) & 0xffffffff
+    return f'{h:08x}'
+
+
+def apply_update(current, update):
+    """
+    Resolve one autosave entry against the answer the server holds.
+    Returns the new text, or None if the client must resend the full answer
+    (its base no longer matches, or the result fails the hash check).
+    """
+    if 'answer' in update:
+        return str(update['answer'])
+
+    delta = update.get('delta')
+    if not isinstance(delta, dict) or update.get('base') != answer_hash(current):
+        return None
+    try:
+        at, remove = int(delta.get('at', 0)), int(delta.get('remove', 0))
+    except (TypeError, ValueError):
+        return None
+    if at < 0 or remove < 0 or at + remove > len(current):
+        return None
+
+    text = current[:at] + str(delta.get('insert', '')) + current[at + remove:]
+    if 'hash' in update and update['hash'] != answer_hash(text):
+        return None
+    return text
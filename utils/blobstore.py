@@ -0,0 +1,102 @@
+"""
+blobstore.py - Content-addressed, deduplicated storage for uploaded files
+
+Uploads are stored once per distinct content, as <root>/<sha[:2]>/<sha>.<ext>,
+so identical re-uploads share one file and no directory grows without bound.
+The `blobs` table counts how many candidates reference each blob; a sweeper
+thread deletes blobs that have stayed unreferenced past a grace period
+(rejected uploads, replaced or removed resumes, deleted candidates).
+"""
+import datetime
+import os
+import threading
+import time
+import uuid
+
+from utils import storage
+
+BLOB_DIR = os.path.join('uploads', 'blobs')
+BLOB_GRACE_SECONDS = 3600    # unreferenced blobs younger than this are kept
+BLOB_SWEEP_INTERVAL = 600
+
+_sweeper_pid = None
+
+
+def init(root):
+    global BLOB_DIR
+    BLOB_DIR = root
+    os.makedirs(os.path.join(BLOB_DIR, 'tmp'), exist_ok=True)
+
+
+def blob_path(sha256, ext):
+    return os.path.join(BLOB_DIR, sha256[:2], f'{sha256}.{ext}')
+
+
+def temp_path():
+    """A fresh path to write an upload to before its hash is known."""
+    return os.path.join(BLOB_DIR, 'tmp', f'{uuid.uuid4().hex}.part')
+
+
+def _lock():
+    # Serialises placing a file against the sweeper deleting the same blob
+    return storage.file_lock(os.path.join(BLOB_DIR, '.lock'))
+
+
+def put(tmp_path, sha256, ext):
+    """
+    Move a fully written temp file into the store (deduplicated). Returns its path.
+    Known content keeps the extension it was first stored with, so one blob is
+    one file whatever the re-upload is named.
+    """
+    with _lock():
+        ext = storage.touch_blob(sha256, ext, os.path.getsize(tmp_path))
+        path = blob_path(sha256, ext)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    return path
+
+
+def sweep():
+    """Delete unreferenced blobs and abandoned temp files past the grace period."""
+    cutoff = datetime.datetime.now() - datetime.timedelta(seconds=BLOB_GRACE_SECONDS)
+    removed = 0
+    for row in storage.list_unreferenced_blobs(cutoff.isoformat()):
+        with _lock():
+            if storage.delete_blob(row['sha256'], cutoff.isoformat()):
+                try:
+                    os.remove(blob_path(row['sha256'], row['ext']))
+                except FileNotFoundError:
+                    pass
+                removed += 1
+
+    tmp_dir = os.path.join(BLOB_DIR, 'tmp')
+    for entry in os.scandir(tmp_dir):
+        if entry.stat().st_mtime < cutoff.timestamp():
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def _sweep_forever():
+    while True:
+        time.sleep(BLOB_SWEEP_INTERVAL)
+        try:
+            removed = sweep()
+            if removed:
+                print(f"🧹 Removed {removed} unreferenced upload(s)")
+        except Exception as e:
+            print(f"❌ Upload sweep failed: {e}")
+
+
+def start_sweeper():
+    """Start the background sweeper once per process."""
+    global _sweeper_pid
+    if _sweeper_pid == os.getpid():
+        return
+    _sweeper_pid = os.getpid()
+    threading.Thread(target=_sweep_forever, name='smarthire-blob-sweeper', daemon=True).start()
@@ -0,0 +1,149 @@
+"""
+export.py - Streamed, filterable results export for /export_results
+
+Rows come from storage.iter_export_rows() a batch at a time and are written
+out as they arrive, so memory stays bounded however many interviews exist.
+Three formats:
+
+    csv       the spreadsheet layout the admin panel always offered
+    ndjson    one JSON object per interview
+    columnar  one JSON object per batch, holding a list of values per column
+
+Every row (every batch, for columnar) carries an opaque cursor; passing it
+back as ?after=<cursor> resumes the export right after that row.
+"""
+import base64
+import csv
+import datetime
+import io
+import json
+
+from utils import storage
+
+EXPORT_BATCH_SIZE = 1000
+
+CSV_HEADER = ['Name', 'Email', 'Date', 'Score', 'Result', 'Duration (min)', 'Cursor']
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'columnar': ('application/x-ndjson', 'columns.ndjson'),
+}
+
+
+def encode_cursor(row):
+    raw = json.dumps([row['date'], row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """(date, interview_id) from a cursor. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        date, interview_id = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(date, str) or not isinstance(interview_id, str):
+        raise ValueError('Invalid cursor')
+    return date, interview_id
+
+
+def _date(value, name, end=False):
+    try:
+        day = datetime.date.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)') from e
+    return (day + datetime.timedelta(days=1) if end else day).isoformat()
+
+
+def _number(value, name):
+    try:
+        return float(value)
+    except ValueError as e:
+        raise ValueError(f'{name} must be a number') from e
+
+
+def parse_filters(args):
+    """
+    Filters for iter_export_rows() from query arguments: from/to (inclusive
+    dates), result, min_score/max_score, skill and after (a cursor).
+    Raises ValueError with a message for the client on bad input.
+    """
+    filters = {}
+    if args.get('from'):
+        filters['date_from'] = _date(args['from'], 'from')
+    if args.get('to'):
+        filters['date_to'] = _date(args['to'], 'to', end=True)
+    if args.get('result'):
+        filters['result'] = args['result']
+    if args.get('min_score'):
+        filters['min_score'] = _number(args['min_score'], 'min_score')
+    if args.get('max_score'):
+        filters['max_score'] = _number(args['max_score'], 'max_score')
+    if args.get('skill'):
+        filters['skill'] = args['skill'].strip().lower().replace(' ', '_')
+    if args.get('after'):
+        filters['after'] = decode_cursor(args['after'])
+    return filters
+
+
+def _batches(filters, limit):
+    remaining = limit
+    for rows in storage.iter_export_rows(batch_size=EXPORT_BATCH_SIZE, **filters):
+        if remaining is not None:
+            rows = rows[:remaining]
+            remaining -= len(rows)
+        yield rows
+        if remaining == 0:
+            return
+
+
+def _csv(batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_HEADER)
+    yield buf.getvalue()
+    for rows in batches:
+        buf.seek(0)
+        buf.truncate()
+        for r in rows:
+            writer.writerow([r['name'], r['email'], (r['date'] or '')[:10], r['score'],
+                             r['result'], (r['duration_seconds'] or 0) // 60,
+                             encode_cursor(r)])
+        yield buf.getvalue()
+
+
+def _ndjson(batches):
+    for rows in batches:
+        yield ''.join(json.dumps({
+            'interview_id': r['id'], 'name': r['name'], 'email': r['email'],
+            'date': r['date'], 'score': r['score'], 'result': r['result'],
+            'duration_seconds': r['duration_seconds'], 'cursor': encode_cursor(r),
+        }) + '\n' for r in rows)
+
+
+def _columnar(batches):
+    for rows in batches:
+        if not rows:
+            continue
+        yield json.dumps({
+            'rows': len(rows),
+            'columns': {
+                'interview_id': [r['id'] for r in rows],
+                'name': [r['name'] for r in rows],
+                'email': [r['email'] for r in rows],
+                'date': [r['date'] for r in rows],
+                'score': [r['score'] for r in rows],
+                'result': [r['result'] for r in rows],
+                'duration_seconds': [r['duration_seconds'] for r in rows],
+            },
+            'cursor': encode_cursor(rows[-1]),
+        }) + '\n'
+
+
+_WRITERS = {'csv': _csv, 'ndjson': _ndjson, 'columnar': _columnar}
+
+
+def stream(fmt, filters, limit=None):
+    """Generator of text chunks exporting the filtered interviews in `fmt`."""
+    return _WRITERS[fmt](_batches(filters, limit))
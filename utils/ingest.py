@@ -0,0 +1,48 @@
+"""
+ingest.py - Single-pass streaming of uploaded files to disk
+
+Reads the upload in chunks and, in the same pass, checks the magic bytes of
+the first chunk, enforces the size limit, hashes the content and writes it
+out. A bogus file is rejected after its first chunk and an oversized one as
+soon as it crosses the limit; neither is rewound or read a second time.
+"""
+import hashlib
+import os
+
+CHUNK_SIZE = 64 * 1024
+HEADER_SIZE = 8
+
+
+class UploadRejected(Exception):
+    """The upload failed validation; str(e) is the message for the user."""
+
+
+def stream_to_disk(stream, save_path, max_bytes, check_header):
+    """
+    Copy `stream` to `save_path`. check_header(first_bytes) returns an error
+    message ('' if fine). Returns (sha256 hex digest, size in bytes).
+    Raises UploadRejected, leaving nothing at save_path.
+    """
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with open(save_path, 'wb') as out:
+            chunk = stream.read(CHUNK_SIZE)
+            err = check_header(chunk[:HEADER_SIZE])
+            if err:
+                raise UploadRejected(err)
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f'File too large. Maximum allowed is '
+                                         f'{max_bytes / (1024 * 1024):.0f} MB.')
+                h.update(chunk)
+                out.write(chunk)
+                chunk = stream.read(CHUNK_SIZE)
+    except BaseException:
+        try:
+            os.remove(save_path)
+        except OSError:
+            pass
+        raise
+    return h.hexdigest(), size
@@ -0,0 +1,65 @@
+"""
+jobs.py - Background job queue with persisted status records
+
+Slow work (resume parsing, scoring) runs on a small thread pool per job kind
+instead of inside the request. Every job has a row in the `jobs` table, so any worker can answer
+a status poll. Job functions receive a report(stage, progress) callback as
+their first argument and return a JSON-serialisable dict.
+"""
+import datetime
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import pools, storage
+
+JOB_WORKERS = int(os.environ.get('SMARTHIRE_JOB_WORKERS', 2))
+JOB_STALE_SECONDS = 600  # a queued/running job not updated for this long was lost
+
+# One pool per job kind, so a queue of one kind (resume parsing) never delays
+# another (scoring); per process, since a pool inherited through fork has no threads
+_executors = pools.PerProcess(dict)
+_executors_lock = threading.Lock()
+
+
+def _executor(kind):
+    executors = _executors.get()
+    with _executors_lock:
+        if kind not in executors:
+            executors[kind] = ThreadPoolExecutor(max_workers=JOB_WORKERS,
+                                                 thread_name_prefix=f'smarthire-{kind}')
+        return executors[kind]
+
+
+def submit(kind, user_id, fn, *args):
+    """Record a job and queue fn(report, *args). Returns the job id."""
+    job_id = str(uuid.uuid4())
+    storage.create_job(job_id, user_id, kind)
+    _executor(kind).submit(_run, job_id, fn, args)
+    return job_id
+
+
+def _run(job_id, fn, args):
+    def report(stage, progress):
+        storage.update_job(job_id, stage=stage, progress=progress)
+
+    storage.update_job(job_id, status='running')
+    try:
+        output = fn(report, *args)
+    except Exception as e:
+        print(f"❌ Job {job_id} failed: {e}")
+        storage.update_job(job_id, status='failed', error=str(e))
+    else:
+        storage.update_job(job_id, status='done', progress=100, output=output or {})
+
+
+def get_status(job_id):
+    """Fetch a job, marking it failed if its worker died mid-way."""
+    job = storage.get_job(job_id)
+    if job and job['status'] in ('queued', 'running'):
+        age = datetime.datetime.now() - datetime.datetime.fromisoformat(job['updated_at'])
+        if age.total_seconds() > JOB_STALE_SECONDS:
+            storage.update_job(job_id, status='failed', error='Job was interrupted')
+            job = storage.get_job(job_id)
+    return job
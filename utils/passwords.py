@@ -0,0 +1,120 @@
+"""
+passwords.py - Password hashing off the request thread, with admission control
+
+PBKDF2 at werkzeug's default cost is roughly half a second of CPU per call.
+Hashes are computed on a small process pool so a burst of logins cannot
+starve the other routes of CPU (or of the GIL). At most HASH_MAX_PENDING
+hashes may be queued or running per process; beyond that (or when a hash
+takes longer than HASH_TIMEOUT, or a pool worker dies and the pool is being
+replaced) hash_password() and check_password() raise Busy, and the route
+answers 429.
+
+The pool and the limit are per gunicorn worker, so HASH_WORKERS defaults to
+the CPU count divided by the number of workers (WEB_CONCURRENCY, which
+gunicorn also reads): all workers together run at most about one hash per
+core and a login storm cannot take every core.
+
+Counters for the pool are kept per process and read with metrics().
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from utils import pools
+
+WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+HASH_WORKERS = int(os.environ.get('SMARTHIRE_HASH_WORKERS',
+                                  max(1, (os.cpu_count() or 1) // WEB_WORKERS)))
+HASH_MAX_PENDING = int(os.environ.get('SMARTHIRE_HASH_MAX_PENDING', 4 * HASH_WORKERS))
+HASH_TIMEOUT = 10  # seconds a request waits for its hash before giving up
+RETRY_AFTER = 2    # seconds suggested to a rejected client
+
+_lock = threading.Lock()
+
+
+class Busy(Exception):
+    """Too many password hashes are already queued; try again shortly."""
+
+
+def _new_state():
+    return {
+        'slots': threading.BoundedSemaphore(HASH_MAX_PENDING),
+        'metrics': dict(submitted=0, completed=0, rejected=0, failed=0,
+                        in_flight=0, busy_seconds=0.0, pool_restarts=0),
+    }
+
+
+_pool = pools.PerProcess(lambda: ProcessPoolExecutor(max_workers=HASH_WORKERS),
+                         close=pools.shutdown_now)
+_state = pools.PerProcess(_new_state)
+
+
+def _count(**deltas):
+    metrics = _state.get()['metrics']
+    with _lock:
+        for key, delta in deltas.items():
+            metrics[key] += delta
+
+
+def _restart(pool, e):
+    # A worker died (e.g. OOM-killed); answer 429 and start a new pool
+    if _pool.discard(pool):
+        _count(pool_restarts=1)
+    raise Busy('Password hashing pool is restarting') from e
+
+
+def _run(fn, *args):
+    pool = _pool.get()
+    slots = _state.get()['slots']
+    if not slots.acquire(blocking=False):
+        _count(rejected=1)
+        raise Busy('Password hashing is saturated')
+    _count(submitted=1, in_flight=1)
+    started = time.monotonic()
+
+    def done(future):
+        # Freed when the worker finishes, even if the request gave up waiting
+        _count(in_flight=-1, busy_seconds=time.monotonic() - started,
+               **({'failed': 1} if future.exception() else {'completed': 1}))
+        slots.release()
+
+    try:
+        future = pool.submit(fn, *args)
+    except Exception as e:
+        _count(in_flight=-1, failed=1)
+        slots.release()
+        if isinstance(e, BrokenProcessPool):
+            _restart(pool, e)
+        raise
+    future.add_done_callback(done)
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except FutureTimeout as e:
+        raise Busy('Password hashing timed out') from e
+    except BrokenProcessPool as e:
+        _restart(pool, e)
+
+
+def hash_password(password):
+    """generate_password_hash() on the pool. Raises Busy when saturated."""
+    return _run(generate_password_hash, password)
+
+
+def check_password(pwhash, password):
+    """check_password_hash() on the pool. Raises Busy when saturated."""
+    return _run(check_password_hash, pwhash, password)
+
+
+def metrics():
+    """This process's hashing counters, plus the configured limits."""
+    with _lock:
+        stats = dict(_state.get()['metrics'])
+    done = stats['completed'] + stats['failed']
+    stats['avg_seconds'] = round(stats['busy_seconds'] / done, 3) if done else 0
+    stats['busy_seconds'] = round(stats['busy_seconds'], 3)
+    stats.update(workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING, pid=os.getpid())
+    return stats
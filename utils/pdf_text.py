@@ -0,0 +1,93 @@
+"""
+pdf_text.py - Bounded PDF text extraction on a process pool
+
+PyPDF2 is pure Python and CPU-bound, so pages are extracted in worker
+processes a few at a time. iter_pages() streams the results as a generator
+and prefetches the next batch while the caller looks at the current one.
+A caller that stops iterating (budget reached, or it has seen enough)
+never schedules the remaining pages.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils import pools
+
+try:
+    import PyPDF2
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PYPDF2_AVAILABLE = False
+
+PDF_WORKERS = int(os.environ.get('SMARTHIRE_PDF_WORKERS', 2))
+PDF_MAX_PAGES = int(os.environ.get('SMARTHIRE_PDF_MAX_PAGES', 10))
+PDF_MAX_CHARS = int(os.environ.get('SMARTHIRE_PDF_MAX_CHARS', 30000))
+PAGES_PER_TASK = 2
+
+_pool = pools.PerProcess(lambda: ProcessPoolExecutor(max_workers=PDF_WORKERS),
+                         close=pools.shutdown_now)
+
+
+def _submit(*args):
+    """Queue _extract_pages(*args), replacing a broken pool once. Returns a task."""
+    pool = _pool.get()
+    try:
+        return pool, pool.submit(_extract_pages, *args), args
+    except BrokenProcessPool:
+        _pool.discard(pool)
+        pool = _pool.get()
+        return pool, pool.submit(_extract_pages, *args), args
+
+
+def _result(task):
+    """Wait for a task; if its pool broke (a worker was killed), rerun it once on a new pool."""
+    pool, future, args = task
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        _pool.discard(pool)
+        return _pool.get().submit(_extract_pages, *args).result()
+
+
+def _extract_pages(filepath, start, stop):
+    """Runs in a worker process. Returns (page_count, [text of pages start..stop))."""
+    with open(filepath, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        count = len(reader.pages)
+        return count, [reader.pages[i].extract_text() or '' for i in range(start, min(stop, count))]
+
+
+def iter_pages(filepath, max_pages=PDF_MAX_PAGES):
+    """Yield the text of each page, up to max_pages. Raises if the PDF cannot be read."""
+    if not PYPDF2_AVAILABLE:
+        raise RuntimeError('PyPDF2 not installed')
+    task = _submit(filepath, 0, min(PAGES_PER_TASK, max_pages))
+    start = 0
+    try:
+        while task is not None:
+            count, pages = _result(task)
+            start += PAGES_PER_TASK
+            limit = min(count, max_pages)
+            task = None
+            if start < limit:
+                task = _submit(filepath, start, min(start + PAGES_PER_TASK, limit))
+            yield from pages
+    finally:
+        if task is not None:
+            task[1].cancel()
+
+
+def extract_text(filepath, max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_CHARS, enough=None):
+    """
+    Extract text page by page until the page or character budget is spent,
+    or until enough(text_so_far) returns True. Pages are joined once.
+    """
+    parts, size = [], 0
+    for page in iter_pages(filepath, max_pages):
+        parts.append(page)
+        size += len(page) + 1
+        if size >= max_chars:
+            break
+        if enough and enough('\n'.join(parts)):
+            break
+    return '\n'.join(parts)[:max_chars]
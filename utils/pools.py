@@ -0,0 +1,44 @@
+"""
+pools.py - Per-process executors and state that survive forks and crashes
+
+Thread and process pools don't carry over a fork (gunicorn forks workers
+after import), and a ProcessPoolExecutor whose worker dies stays broken.
+PerProcess builds its value on first use in each process; discard() drops
+a broken one so the next get() builds a fresh one.
+"""
+import os
+import threading
+
+
+class PerProcess:
+    """The value of factory(), built once per process. close(value) runs when it is discarded."""
+
+    def __init__(self, factory, close=None):
+        self._factory = factory
+        self._close = close
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._value = self._factory()
+                self._pid = os.getpid()
+            return self._value
+
+    def discard(self, value):
+        """Drop `value` if it is still current. Returns True if it was."""
+        with self._lock:
+            current = self._pid == os.getpid() and self._value is value
+            if current:
+                self._pid = None
+                self._value = None
+        if current and self._close:
+            self._close(value)
+        return current
+
+
+def shutdown_now(executor):
+    """close= for executors: stop without waiting for a broken pool's workers."""
+    executor.shutdown(wait=False)
@@ -0,0 +1,410 @@
+"""
+question_bank.py - Integer-indexed question bank
+
+Every distinct question in a {topic: [questions]} bank gets an integer ID.
+Per-topic ID lists and bitmasks are built once, and a candidate's asked set
+is a bitset (a Python int; bit i set means question i was asked), so
+drawing k unseen questions costs O(k) instead of filtering the whole topic
+pool against the candidate's full history.
+
+IDs are positions and shift when the CSV changes; what gets persisted is
+question_key(text), a short stable hash of the question.
+
+get_index() is the one place the app and utils/question_loader.py get the
+bank from. It loads on first use, from a pickled snapshot when the CSV has
+not changed (same mtime and size, or failing that the same sha256); parsing
+the CSV and writing a new snapshot only happen when it has.
+
+start_watcher() loads the bank in the background at startup and then polls
+the CSV; when it changes, the new index is built on the watcher thread and
+swapped in with a single assignment. Requests keep using whichever index
+they picked up, and interviews store question texts, so nothing in flight
+depends on the old one. get_index() also starts the watcher, so a worker
+forked after startup gets its own.
+
+resolve_topics(skill) answers "which CSV topics serve this skill" from a
+table built once per bank version, covering every registered skill name
+and CSV topic; skills with no topic are reported when the table is built.
+"""
+import csv
+import hashlib
+import html
+import json
+import os
+import pickle
+import random
+import threading
+import time
+
+from utils.relevance import RelevanceModel
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'interview_questions_complete.csv')
+SNAPSHOT_PATH = CSV_PATH + '.pickle'
+SNAPSHOT_FORMAT = 3  # bump when QuestionIndex's attributes or clean_question() change
+RELOAD_INTERVAL = int(os.environ.get('SMARTHIRE_QUESTIONS_RELOAD', 30))  # seconds
+
+# Smart skill → CSV topic mapper (fixes 0-questions bug)
+SKILL_TOPIC_MAP = {
+    'machine_learning': 'problem_solving_soft',
+    'machine learning': 'problem_solving_soft',
+    'deep_learning': 'problem_solving_soft',
+    'deep learning': 'problem_solving_soft',
+    'problem_solving': ['problem_solving_soft', 'problem_solving_mgmt'],
+    'problem solving': ['problem_solving_soft', 'problem_solving_mgmt'],
+    'critical_thinking': 'critical_thinking',
+    'critical thinking': 'critical_thinking',
+    'time_management': 'time_management',
+    'time management': 'time_management',
+    'teamwork': 'teamwork',
+    'leadership': 'leadership',
+    'communication': 'communication',
+    'adaptability': 'adaptability',
+    'emotional_intelligence': 'emotional_intelligence',
+    'emotional intelligence': 'emotional_intelligence',
+    'work_ethic': 'work_ethic',
+    'work ethic': 'work_ethic',
+    'creativity': 'creativity',
+    'negotiation': 'negotiation',
+    'stress_management': 'stress_management',
+    'stress management': 'stress_management',
+    'training': 'training_development',
+    'training_development': 'training_development',
+    'recruitment': 'recruitment',
+    'risk_management': 'risk_management',
+    'risk management': 'risk_management',
+    'project_management': 'project_management',
+    'project management': 'project_management',
+    'team_management': 'team_management',
+    'team management': 'team_management',
+    'strategic_planning': 'strategic_planning',
+    'strategic planning': 'strategic_planning',
+    'decision_making': 'decision_making',
+    'decision making': 'decision_making',
+    'conflict_resolution': 'conflict_resolution',
+    'conflict resolution': 'conflict_resolution',
+    'performance_management': 'performance_management',
+    'change_management': 'change_management',
+    'employee_relations': 'employee_relations',
+    'interpersonal_skills': 'interpersonal_skills',
+    'cultural_awareness': 'cultural_awareness',
+    'ethics': 'ethics',
+    'dependability': 'dependability',
+    'initiative': 'initiative',
+    'numpy': 'python',
+    'pandas': 'python',
+    'tensorflow': 'python',
+    'pytorch': 'python',
+    'keras': 'python',
+    'node': 'nodejs',
+    'express': 'express',
+    'c++': 'cpp',
+    'cpp': 'cpp',
+    'c#': 'csharp',
+    'csharp': 'csharp',
+    'r': None,  # too generic — skip
+}
+
+# Used when the CSV is missing
+FALLBACK_BANK = {
+    'python': ['What is Python?', 'What are lists and tuples?'],
+    'java': ['What is JVM?', 'What is inheritance?'],
+    'javascript': ['What is closure?', 'What is event loop?'],
+    'html': ['What is HTML?', 'What are semantic tags?'],
+    'css': ['What is CSS box model?', 'What is flexbox?'],
+    'sql': ['What is JOIN?', 'What is primary key?'],
+    'leadership': ['How do you lead a team?', 'How do you handle conflicts?'],
+    'communication': ['How do you handle difficult conversations?'],
+    'problem_solving': ['How do you approach complex problems?'],
+    'teamwork': ['How do you handle team conflicts?'],
+    'percentages': ['What is 20% of 150?', 'If 30% of a number is 60, what is the number?'],
+    'averages': ['Find average of 5,10,15,20', 'The average of 4 numbers is 15.'],
+    'probability': ['What is probability of getting heads?']
+}
+
+_index = None
+_topic_table = None     # (bank version, {skill: [topics]})
+_known_skills = set()
+_index_stat = None      # CSV (mtime_ns, size) the current index was loaded from
+_lock = threading.Lock()
+_watcher_pid = None
+
+
+def question_key(text):
+    """Stable, compact key for a question (what the asked-questions history stores)."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:10]
+
+
+class QuestionIndex:
+    """Built once per bank; `version` changes whenever the bank's contents do."""
+
+    def __init__(self, bank):
+        self.bank = bank        # topic -> [question texts], as loaded
+        self.questions = []     # id -> question text
+        self.ids = {}           # question text -> id
+        self.by_key = {}        # question_key(text) -> id
+        self.topics = {}        # topic -> [ids], in bank order, no repeats
+        self.masks = {}         # topic -> bitmask of its ids
+        for topic, questions in bank.items():
+            ids, seen = [], set()
+            for q in questions:
+                qid = self.ids.get(q)
+                if qid is None:
+                    qid = self.ids[q] = len(self.questions)
+                    self.by_key[question_key(q)] = qid
+                    self.questions.append(q)
+                if qid not in seen:
+                    seen.add(qid)
+                    ids.append(qid)
+            self.topics[topic] = ids
+            self.masks[topic] = sum(1 << qid for qid in ids)
+        self.relevance = RelevanceModel(bank)   # answer scoring, see utils/relevance.py
+        self.version = hashlib.sha1(
+            json.dumps(bank, sort_keys=True).encode()).hexdigest()[:12]
+
+    def bitset(self, keys):
+        """Asked bitset for a list of question keys (unknown keys are ignored)."""
+        bits = 0
+        for key in keys:
+            qid = self.by_key.get(key)
+            if qid is not None:
+                bits |= 1 << qid
+        return bits
+
+    def pool(self, topics):
+        """All ids of the given topics, concatenated."""
+        return [qid for t in topics for qid in self.topics.get(t, [])]
+
+    def sample(self, topics, k, asked=0, rng=random):
+        """
+        Up to k distinct ids from the given topics whose bits are not set in
+        `asked`. Returns fewer only when fewer unseen questions exist.
+        """
+        pools = [self.topics[t] for t in topics if self.topics.get(t)]
+        if not pools or k <= 0:
+            return []
+        mask = 0
+        for t in topics:
+            mask |= self.masks.get(t, 0)
+        unseen = (mask & ~asked).bit_count()
+        total = sum(len(p) for p in pools)
+
+        if unseen <= k or unseen * 4 < total:
+            # Mostly-seen pool: rejection sampling would spin, list the unseen ones
+            available = list({qid for p in pools for qid in p if not asked >> qid & 1})
+            rng.shuffle(available)
+            return available[:k]
+
+        picked, taken = [], asked
+        while len(picked) < k:
+            r = rng.randrange(total)
+            for p in pools:
+                if r < len(p):
+                    qid = p[r]
+                    break
+                r -= len(p)
+            if not taken >> qid & 1:
+                picked.append(qid)
+                taken |= 1 << qid
+        return picked
+
+    def texts(self, ids):
+        return [self.questions[qid] for qid in ids]
+
+    def keys(self, ids):
+        return [question_key(self.questions[qid]) for qid in ids]
+
+
+# ─────────────────────────────────────────────────────────────────
+# LOADING
+# ─────────────────────────────────────────────────────────────────
+
+def clean_question(question):
+    """Unescape HTML entities and collapse whitespace. Tags are kept: questions
+    about HTML mention them literally (e.g. "What is the <div> tag?")."""
+    if not question:
+        return question
+    return ' '.join(html.unescape(question).split())
+
+
+def parse_csv(csv_path):
+    """Read the CSV into {topic: [questions]}."""
+    bank = {}
+    with open(csv_path, 'r', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            topic = row['Topic'].strip().lower()
+            question = clean_question(row['Question'])
+            if question:
+                bank.setdefault(topic, []).append(question)
+    return bank
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_snapshot():
+    try:
+        with open(SNAPSHOT_PATH, 'rb') as f:
+            snap = pickle.load(f)
+        return snap if snap.get('format') == SNAPSHOT_FORMAT else None
+    except Exception:
+        return None
+
+
+def _write_snapshot(snap):
+    tmp = f'{SNAPSHOT_PATH}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump(snap, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, SNAPSHOT_PATH)
+    except OSError as e:
+        print(f"⚠️ Could not write question bank snapshot: {e}")
+
+
+def load_index():
+    """Build the index for CSV_PATH, reusing the snapshot if the CSV is unchanged."""
+    csv_path = CSV_PATH
+    if not os.path.exists(csv_path):
+        print(f"⚠️ CSV file not found. Please run generate_complete_csv.py first.")
+        return QuestionIndex(FALLBACK_BANK)
+
+    st = os.stat(csv_path)
+    snap = _read_snapshot()
+    if snap and (snap['mtime_ns'], snap['size']) == (st.st_mtime_ns, st.st_size):
+        return snap['index']
+
+    digest = _file_sha256(csv_path)
+    if snap and snap['sha256'] == digest:
+        index = snap['index']           # touched but not changed
+    else:
+        try:
+            index = QuestionIndex(parse_csv(csv_path))
+        except Exception as e:
+            print(f"❌ Error loading CSV: {e}")
+            return QuestionIndex({})
+        print(f"✅ Loaded {len(index.questions)} questions from CSV")
+    _write_snapshot({'format': SNAPSHOT_FORMAT, 'mtime_ns': st.st_mtime_ns,
+                     'size': st.st_size, 'sha256': digest, 'index': index})
+    return index
+
+
+def _csv_stat():
+    try:
+        st = os.stat(CSV_PATH)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def get_index():
+    """The shared question bank index, loaded on first use."""
+    global _index, _index_stat
+    start_watcher()     # a worker forked after startup (gunicorn --preload) has none yet
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index_stat = _csv_stat()
+                _index = load_index()
+    return _index
+
+
+def reload_if_changed():
+    """Rebuild and swap in the index if the CSV changed. Returns True if swapped."""
+    global _index, _index_stat
+    stat = _csv_stat()
+    if _index is not None and stat == _index_stat:
+        return False
+    index = load_index()
+    if _csv_stat() != stat:
+        return False        # still being written; try again next poll
+    changed = _index is None or index.version != _index.version
+    with _lock:
+        _index, _index_stat = index, stat
+    return changed
+
+
+def _watch_forever():
+    topic_table(get_index())
+    while True:
+        time.sleep(RELOAD_INTERVAL)
+        try:
+            if reload_if_changed():
+                print(f"🔄 Question bank reloaded ({len(_index.questions)} questions)")
+                topic_table(_index)
+        except Exception as e:
+            print(f"❌ Question bank reload failed: {e}")
+
+
+def start_watcher():
+    """Warm the bank in the background and watch the CSV, once per process."""
+    global _watcher_pid
+    if _watcher_pid == os.getpid():
+        return
+    _watcher_pid = os.getpid()
+    threading.Thread(target=_watch_forever, name='smarthire-question-watcher', daemon=True).start()
+
+
+# ─────────────────────────────────────────────────────────────────
+# SKILL → TOPIC RESOLUTION
+# ─────────────────────────────────────────────────────────────────
+
+def _resolve(s, topics):
+    """Map a normalised skill name to its CSV topic(s)."""
+    # Direct CSV key?
+    if topics.get(s):
+        return [s]
+    # Map lookup
+    mapped = SKILL_TOPIC_MAP.get(s)
+    if mapped is None and s in SKILL_TOPIC_MAP:
+        return []  # explicitly skipped
+    if mapped:
+        if isinstance(mapped, list):
+            return [t for t in mapped if t in topics]
+        if mapped in topics:
+            return [mapped]
+    # Try underscore ↔ space
+    for v in [s.replace(' ', '_'), s.replace('_', ' ')]:
+        if topics.get(v):
+            return [v]
+    return []
+
+
+def register_skills(skills):
+    """Add skill names the resolution table must cover (rebuilt on next use)."""
+    global _topic_table
+    _known_skills.update(s.lower().strip() for s in skills)
+    _topic_table = None
+
+
+def topic_table(index=None):
+    """{skill: [topics]} for every known skill, CSV topic and mapped name, memoized per bank version."""
+    global _topic_table
+    index = index or get_index()
+    memo = _topic_table
+    if memo and memo[0] == index.version:
+        return memo[1]
+
+    table = {}
+    for name in _known_skills | set(index.topics) | set(SKILL_TOPIC_MAP):
+        for v in (name, name.replace(' ', '_'), name.replace('_', ' ')):
+            if v not in table:
+                table[v] = _resolve(v, index.topics)
+    unmapped = sorted(s for s in _known_skills if not table[s] and s not in SKILL_TOPIC_MAP)
+    if unmapped:
+        print(f"⚠️ {len(unmapped)} skills have no CSV topic and get generic questions: "
+              f"{', '.join(unmapped[:10])}{', ...' if len(unmapped) > 10 else ''}")
+    _topic_table = (index.version, table)
+    return table
+
+
+def resolve_topics(skill, index=None):
+    """The CSV topics for a skill (empty list if none)."""
+    index = index or get_index()
+    s = skill.lower().strip()
+    topics = topic_table(index).get(s)
+    return list(topics) if topics is not None else _resolve(s, index.topics)
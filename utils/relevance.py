@@ -0,0 +1,97 @@
+"""
+relevance.py - BM25 relevance of an answer to its interview question
+
+Built once per question bank (see QuestionIndex in utils/question_bank.py)
+and pickled with it. Every question gets a sparse vector of reference
+keywords: its own content words, plus the most distinctive words of its
+topic at half weight, each weighted by BM25 IDF over the whole bank. An
+answer is scored by tokenizing it once and looking each keyword up in its
+term counts, so the cost depends on the answer's length, not the bank's.
+"""
+import math
+import re
+from collections import Counter
+
+K1 = 1.2
+B = 0.75
+AVG_ANSWER_TERMS = 40   # answer length BM25 treats as typical (content words)
+TOPIC_TERMS = 8         # distinctive topic words added to each question's vector
+TOPIC_WEIGHT = 0.5
+
+_TOKEN = re.compile(r'[a-z0-9][a-z0-9+#]*')
+STOPWORDS = frozenset('''
+    a about above after again all also am an and any are as at be because been
+    before being below between both but by can could did do does doing down
+    during each few for from further had has have having he her here hers him
+    his how i if in into is it its itself just me more most my no nor not now
+    of off on once only or other our out over own same she should so some such
+    than that the their them then there these they this those through to too
+    under until up very was we were what when where which while who whom why
+    will with would you your
+    describe explain example examples give tell difference between mean means
+    meant define use used using how work works time situation discuss
+'''.split())
+
+
+def _stem(word):
+    if len(word) > 5 and word.endswith('ing'):
+        return word[:-3]
+    if len(word) > 4 and word.endswith('ed'):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercased, lightly stemmed content words."""
+    return [_stem(w) for w in _TOKEN.findall(text.lower())
+            if w not in STOPWORDS and (len(w) > 1 or w in 'cr')]
+
+
+class RelevanceModel:
+    """IDF table and per-question keyword vectors for one {topic: [questions]} bank."""
+
+    def __init__(self, bank):
+        terms = {q: set(tokenize(q)) for questions in bank.values() for q in questions}
+        df = Counter(t for ts in terms.values() for t in ts)
+        n = max(len(terms), 1)
+        self.idf = {t: math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+        self._default_idf = math.log(1 + (n + 0.5) / 0.5)   # a word the bank never uses
+
+        self.vectors = {}
+        for topic, questions in bank.items():
+            weight = Counter()
+            for q in questions:
+                for t in terms[q]:
+                    weight[t] += self.idf[t]
+            for t in tokenize(topic.replace('_', ' ')):
+                weight[t] += self._default_idf
+            topic_terms = [t for t, _ in weight.most_common(TOPIC_TERMS)]
+            for q in questions:
+                vec = {t: self.idf[t] for t in terms[q]}
+                for t in topic_terms:
+                    vec.setdefault(t, self.idf.get(t, self._default_idf) * TOPIC_WEIGHT)
+                self.vectors[q] = vec
+
+    def vector(self, question):
+        """Reference keywords for a question (computed on the fly if not in the bank)."""
+        vec = self.vectors.get(question)
+        if vec is None:
+            vec = {t: self.idf.get(t, self._default_idf) for t in set(tokenize(question))}
+        return vec
+
+    def score(self, question, answer):
+        """
+        BM25 relevance of the answer to the question, scaled so that an answer of
+        typical length using every keyword once scores 1.0. Returns (0..1, words).
+        """
+        tokens = tokenize(answer)
+        vec = self.vector(question)
+        total = sum(vec.values())
+        if not tokens or not total:
+            return 0.0, len(tokens)
+        tf = Counter(tokens)
+        norm = K1 * (1 - B + B * len(tokens) / AVG_ANSWER_TERMS)
+        s = sum(w * tf[t] * (K1 + 1) / (tf[t] + norm) for t, w in vec.items() if t in tf)
+        return min(1.0, s / total), len(tokens)
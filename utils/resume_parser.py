@@ -4,14 +4,11 @@ Validates uploaded file, checks it's a resume, extracts skills.
 No external magic/libmagic dependency — uses file header bytes.
 """
 
-import re
 import os
 
-try:
-    import PyPDF2
-    PYPDF2_AVAILABLE = True
-except ImportError:
-    PYPDF2_AVAILABLE = False
+from utils import ingest, pdf_text
+from utils.pdf_text import PYPDF2_AVAILABLE
+from utils.skill_matcher import SkillMatcher
 
 # ─────────────────────────────────────────────────────────────────
 # FILE VALIDATION
@@ -27,55 +24,45 @@ FILE_SIGNATURES = {
 MAX_FILE_SIZE_MB = 10
 
 
-def _get_file_type(file) -> str | None:
+def _get_file_type(header: bytes) -> str | None:
     """
-    Read first 8 bytes to detect real file type.
+    Detect the real file type from the first bytes of the file.
     Returns 'pdf', 'doc', 'docx', or None if unrecognised.
     """
-    file.seek(0)
-    header = file.read(8)
-    file.seek(0)
     for sig, ftype in FILE_SIGNATURES.items():
         if header.startswith(sig):
             return ftype
     return None
 
 
-def _get_size_mb(file) -> float:
-    file.seek(0, os.SEEK_END)
-    size = file.tell() / (1024 * 1024)
-    file.seek(0)
-    return size
-
-
-def validate_file(file, filename: str) -> tuple[bool, str]:
+def save_file(file, filename: str, save_path: str) -> tuple[bool, str, str]:
     """
-    Run all pre-save checks on the uploaded file object.
-    Returns (ok: bool, error_message: str).
+    Validate the uploaded file while streaming it to save_path, in one pass
+    (see utils/ingest.py). Nothing is left on disk if it is rejected.
+    Returns (ok: bool, error_message: str, sha256: str).
     """
     # 1. Extension check
     ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
     if ext not in ('pdf', 'doc', 'docx'):
-        return False, 'Invalid file type. Please upload a PDF, DOC, or DOCX resume.'
-
-    # 2. Size check
-    size_mb = _get_size_mb(file)
-    if size_mb > MAX_FILE_SIZE_MB:
-        return False, f'File too large ({size_mb:.1f} MB). Maximum allowed size is {MAX_FILE_SIZE_MB} MB.'
-
-    # 3. Real file type (magic bytes) — catches renamed files
-    real_type = _get_file_type(file)
-    if real_type is None:
-        return False, 'File format not recognised. Please upload a valid PDF or Word document.'
-
-    # Extension must match the actual file type
-    ext_to_real = {'pdf': 'pdf', 'doc': 'doc', 'docx': 'docx'}
-    if ext_to_real.get(ext) != real_type and not (ext == 'docx' and real_type == 'docx'):
-        # Allow .docx to be real 'docx' (PK signature)
-        if not (real_type == 'docx' and ext in ('docx',)):
-            return False, f'File extension ".{ext}" does not match the actual file contents. Please upload a genuine document.'
+        return False, 'Invalid file type. Please upload a PDF, DOC, or DOCX resume.', ''
+
+    # 2. Real file type (magic bytes) — catches renamed files
+    def check_header(header):
+        real_type = _get_file_type(header)
+        if real_type is None:
+            return 'File format not recognised. Please upload a valid PDF or Word document.'
+        # Extension must match the actual file type
+        if real_type != ext:
+            return f'File extension ".{ext}" does not match the actual file contents. Please upload a genuine document.'
+        return ''
 
-    return True, ''
+    # 3. Size check happens as the file is written
+    try:
+        digest, _ = ingest.stream_to_disk(file, save_path, MAX_FILE_SIZE_MB * 1024 * 1024,
+                                          check_header)
+    except ingest.UploadRejected as e:
+        return False, str(e), ''
+    return True, '', digest
 
 
 def validate_and_parse_resume(file, filename: str, save_path: str) -> dict:
@@ -97,17 +84,11 @@ def validate_and_parse_resume(file, filename: str, save_path: str) -> dict:
             return error_response(result['error'])
         skills = result['skills']
     """
-    # Step 1 — file-level validation (type, size, magic bytes)
-    ok, err = validate_file(file, filename)
+    # Steps 1–2 — file-level validation (type, size, magic bytes) while saving to disk
+    ok, err, _ = save_file(file, filename, save_path)
     if not ok:
         return {'ok': False, 'error': err, 'text': '', 'skills': [], 'matched_keywords': []}
 
-    # Step 2 — save to disk so we can extract text
-    file.seek(0)
-    with open(save_path, 'wb') as f:
-        for chunk in iter(lambda: file.read(8192), b''):
-            f.write(chunk)
-
     # Step 3 — extract text (PDF supported; DOC/DOCX needs python-docx — TODO)
     ext = filename.rsplit('.', 1)[-1].lower()
     if ext == 'pdf':
@@ -154,14 +135,8 @@ def extract_text_from_pdf(filepath: str) -> str:
         print('⚠ PyPDF2 not installed — cannot extract PDF text.')
         return ''
     try:
-        text = ''
-        with open(filepath, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + '\n'
-        return text.strip()
+        # Pages stream from a process pool and stop at the page/char budget
+        return pdf_text.extract_text(filepath).strip()
     except Exception as e:
         print(f'PDF extraction error: {e}')
         return ''
@@ -291,6 +266,16 @@ _SKILLS = {
 }
 
 
+# Substring match for multi-word phrases and signals of 1–2 characters,
+# word-boundary match for everything else. Compiled once at import.
+_SKILL_MATCHER = SkillMatcher(
+    (signal, skill_key, not (' ' in signal or len(signal) <= 2))
+    for skill_key, signals in _SKILLS.items()
+    for signal in signals
+)
+
+
+
 def extract_skills(text: str) -> list:
     """
     Match resume text against skills database.
@@ -299,28 +284,5 @@ def extract_skills(text: str) -> list:
     if not text:
         return []
 
-    text_lower = text.lower()
-    found = []
-
-    for skill_key, signals in _SKILLS.items():
-        for signal in signals:
-            # Word-boundary match for short single words, substring for multi-word phrases
-            if ' ' in signal or len(signal) <= 2:
-                if signal in text_lower:
-                    found.append(skill_key)
-                    break
-            else:
-                pattern = r'\b' + re.escape(signal) + r'\b'
-                if re.search(pattern, text_lower, re.IGNORECASE):
-                    found.append(skill_key)
-                    break
-
-    # Deduplicate while preserving order
-    seen = set()
-    result = []
-    for s in found:
-        if s not in seen:
-            seen.add(s)
-            result.append(s)
-
-    return result
+    # Single pass over the text; keys come back deduplicated in _SKILLS order
+    return _SKILL_MATCHER.find(text.lower())
@@ -0,0 +1,356 @@
+"""
+scoring.py - Pluggable interview scoring engine
+
+A Scorer turns one question/answer pair into a technical and a communication
+score (0-100). score_interview() runs the configured scorer over every
+question and builds the per-question breakdown, averages, result and
+feedback text shown on the results page. /submit_interview no longer does
+this inline: submit() queues a 'scoring' job (utils/jobs.py, on a queue of
+its own, not shared with resume parsing) that runs score_interview() on a
+process pool. The interview's result reads 'scoring' until the job has
+written the scores back, so slower scorers never hold up a web worker.
+
+Add a scorer by subclassing Scorer and passing it to register_scorer();
+SMARTHIRE_SCORER picks the one in use.
+
+Answers are also scored one by one as they are autosaved (score_answers(),
+stored in the same transaction as the journal entry);
+the cached per-question scores are keyed by answer hash and scorer, so the
+submit job only recomputes questions whose answer changed since, and an
+unchanged answer is never scored twice.
+
+rescore_all() (`flask rescore`) re-applies the current formula to every
+stored interview: interviews are streamed in batches, each batch's answers
+are scored in one score_many() call (vectorized with NumPy when installed)
+and the results are written back in one transaction per batch.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils import jobs, pools, question_bank, storage
+from utils.autosave import answer_hash
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+SCORING_WORKERS = int(os.environ.get('SMARTHIRE_SCORING_WORKERS', 1))
+
+PASS_MARK = 60
+TECH_WEIGHT, COMM_WEIGHT = 0.6, 0.4
+
+
+class Scorer:
+    """Scores one answered question. Subclasses set `name` and implement score()."""
+
+    name = None
+
+    def score(self, question, answer):
+        """Return (technical, communication) for a non-empty answer, each 0-100."""
+        raise NotImplementedError
+
+    def key(self):
+        """Identifies the scores this scorer produces; cached scores with another key are stale."""
+        return self.name
+
+    def score_many(self, pairs):
+        """Scores for a list of (question, answer) pairs; override to vectorize."""
+        return [self.score(q, a) for q, a in pairs]
+
+
+class HeuristicScorer(Scorer):
+    """Answer length plus words shared with the question."""
+
+    name = 'heuristic'
+
+    def score(self, question, answer):
+        word_count = len(answer.split())
+        # Technical score based on length and keyword matching
+        overlap = len(set(question.lower().split()) & set(answer.lower().split()))
+        tech = min(100, word_count * 4 + overlap * 5)
+        # Communication score based on length and structure
+        comm = min(100, word_count * 3 + (10 if '.' in answer else 0) + (10 if ',' in answer else 0))
+        return tech, comm
+
+    def score_many(self, pairs):
+        # Tokenize once per distinct question (they repeat across interviews),
+        # then apply the formula to whole columns at a time
+        q_words = {}
+        word_counts, overlaps, dots, commas = [], [], [], []
+        for question, answer in pairs:
+            qw = q_words.get(question)
+            if qw is None:
+                qw = q_words[question] = set(question.lower().split())
+            tokens = answer.lower().split()
+            word_counts.append(len(tokens))
+            overlaps.append(len(qw.intersection(tokens)))
+            dots.append('.' in answer)
+            commas.append(',' in answer)
+        if not NUMPY_AVAILABLE:
+            return [(min(100, wc * 4 + ov * 5), min(100, wc * 3 + 10 * d + 10 * c))
+                    for wc, ov, d, c in zip(word_counts, overlaps, dots, commas)]
+        wc = np.array(word_counts)
+        tech = np.minimum(100, wc * 4 + np.array(overlaps) * 5)
+        comm = np.minimum(100, wc * 3 + np.array(dots) * 10 + np.array(commas) * 10)
+        return list(zip(tech.tolist(), comm.tolist()))
+
+
+class RelevanceScorer(Scorer):
+    """
+    Technical score from BM25 relevance to the question's reference keywords
+    (utils/relevance.py, precomputed with the question bank) plus a small
+    credit for length; communication is scored as in HeuristicScorer.
+    """
+
+    name = 'relevance'
+
+    def __init__(self):
+        self._comm = HeuristicScorer()
+
+    def key(self):
+        # IDF weights change with the bank
+        return f'{self.name}:{question_bank.get_index().version}'
+
+    def score(self, question, answer):
+        relevance, words = question_bank.get_index().relevance.score(question, answer)
+        tech = min(100, 80 * relevance + min(20, words))
+        return tech, self._comm.score(question, answer)[1]
+
+    def score_many(self, pairs):
+        model = question_bank.get_index().relevance
+        comms = self._comm.score_many(pairs)
+        out = []
+        for (question, answer), (_, comm) in zip(pairs, comms):
+            relevance, words = model.score(question, answer)
+            out.append((min(100, 80 * relevance + min(20, words)), comm))
+        return out
+
+
+SCORERS = {}
+SCORER_NAME = os.environ.get('SMARTHIRE_SCORER', 'relevance')
+
+_instances = {}
+
+
+def register_scorer(cls):
+    SCORERS[cls.name] = cls
+    return cls
+
+
+register_scorer(HeuristicScorer)
+register_scorer(RelevanceScorer)
+
+
+def get_scorer(name=None):
+    name = name or SCORER_NAME
+    if name not in _instances:
+        _instances[name] = SCORERS[name]()
+    return _instances[name]
+
+
+# ─────────────────────────────────────────────────────────────────
+# SCORING AN INTERVIEW
+# ─────────────────────────────────────────────────────────────────
+
+def answer_feedback(word_count):
+    """One-line feedback for an answer of `word_count` words (0 = not answered)."""
+    if word_count == 0:
+        return "❌ No answer provided. Always attempt every question."
+    elif word_count < 15:
+        return "⚠️ Very brief answer. Add more details and examples."
+    elif word_count < 30:
+        return "📝 Good start. Could include more specific examples."
+    elif word_count < 60:
+        return "✅ Good answer. Well structured."
+    else:
+        return "🌟 Excellent answer! Detailed and well explained."
+
+
+def score_question(question, answer, scorer=None):
+    """Per-question breakdown: technical/communication score and feedback."""
+    answer = (answer or '').strip()
+    if answer:
+        tech, comm = (scorer or get_scorer()).score(question, answer)
+    else:
+        tech, comm = 0, 0
+    return _breakdown(tech, comm, answer)
+
+
+def _breakdown(tech, comm, answer):
+    return {
+        'technical_score': round(min(100, tech), 1),
+        'communication_score': round(min(100, comm), 1),
+        'feedback': answer_feedback(len(answer.split()))
+    }
+
+
+def summarize(questions, per_question):
+    """Aggregate per-question scores. Returns (scores, feedback, result)."""
+    tech_scores = [pq['technical_score'] for pq in per_question]
+    comm_scores = [pq['communication_score'] for pq in per_question]
+    avg_tech = round(sum(tech_scores) / len(tech_scores), 1) if tech_scores else 0
+    avg_comm = round(sum(comm_scores) / len(comm_scores), 1) if comm_scores else 0
+    overall = round((avg_tech * TECH_WEIGHT + avg_comm * COMM_WEIGHT), 1)
+
+    scores = {
+        'technical': avg_tech,
+        'communication': avg_comm,
+        'overall': overall,
+        'per_question': per_question
+    }
+
+    answered = sum(1 for q in questions if q.get('answer', '').strip())
+
+    # Generate summary feedback
+    feedback_lines = [
+        f"✅ You answered {answered}/{len(questions)} questions.",
+        f"📊 Overall Score: {overall}%",
+        "",
+        "📈 Performance Summary:"
+    ]
+
+    if avg_tech < 50:
+        feedback_lines.append("• Technical knowledge needs improvement. Review core concepts.")
+    else:
+        feedback_lines.append("• Good technical understanding demonstrated.")
+
+    if avg_comm < 50:
+        feedback_lines.append("• Work on structuring answers with more clarity.")
+    else:
+        feedback_lines.append("• Clear communication style.")
+
+    if answered < len(questions):
+        feedback_lines.append(f"• {len(questions) - answered} questions left unanswered.")
+
+    feedback_lines.append("")
+    feedback_lines.append("📝 Detailed Feedback:")
+
+    for i, pq in enumerate(per_question):
+        status = "✓" if questions[i].get('answer', '').strip() else "✗"
+        feedback_lines.append(f"Q{i+1} {status} [Tech: {pq['technical_score']}% | Comm: {pq['communication_score']}%]: {pq['feedback']}")
+
+    result = 'selected' if overall >= PASS_MARK else 'rejected'
+    return scores, "\n".join(feedback_lines), result
+
+
+def score_interview(questions, scorer=None, cached=None):
+    """
+    Score every question and aggregate. Returns (scores, feedback, result).
+    `cached` ({q_index: row} from storage.get_answer_scores) is reused where it
+    matches the current answer and scorer.
+    """
+    scorer = scorer or get_scorer()
+    key = scorer.key() if cached else None
+    per_question = []
+    for i, q in enumerate(questions):
+        answer = (q.get('answer') or '').strip()
+        row = (cached or {}).get(i)
+        if row and row['scorer'] == key and row['answer_hash'] == answer_hash(answer):
+            per_question.append(_breakdown(row['technical'], row['communication'], answer))
+        else:
+            per_question.append(score_question(q['question'], answer, scorer))
+    return summarize(questions, per_question)
+
+
+def score_answers(interview_id, answers, questions=None):
+    """
+    Score answers about to be saved ({q_index: answer}). Answers already
+    scored with the same text and scorer are skipped. `questions`
+    ({q_index: question text}) saves a lookup when the caller has it.
+    Returns the rows to store with them, for storage.set_answers(scores=...).
+    """
+    scorer = get_scorer()
+    key = scorer.key()
+    cached = storage.get_answer_scores(interview_id)
+    todo = {}
+    for q_index, answer in answers.items():
+        answer = (answer or '').strip()
+        digest = answer_hash(answer)
+        row = cached.get(q_index)
+        if not (row and row['scorer'] == key and row['answer_hash'] == digest):
+            todo[q_index] = (answer, digest)
+    if not todo:
+        return []
+
+    questions = questions or storage.get_question_texts(interview_id, list(todo))
+    scored = iter(scorer.score_many([(questions[i], a) for i, (a, _) in todo.items() if a]))
+    return [(i, digest, key, *(next(scored) if a else (0, 0))) for i, (a, digest) in todo.items()]
+
+
+# ─────────────────────────────────────────────────────────────────
+# BACKGROUND SCORING
+# ─────────────────────────────────────────────────────────────────
+
+# The scorer runs in its own processes so it never holds the web worker's GIL
+_pool = pools.PerProcess(lambda: ProcessPoolExecutor(max_workers=SCORING_WORKERS),
+                         close=pools.shutdown_now)
+
+
+def submit(interview_id, user_id):
+    """Queue scoring of a submitted interview. Returns the job id."""
+    job_id = jobs.submit('scoring', user_id, _score_job, interview_id)
+    storage.update_interview(interview_id, scoring_job=job_id)
+    return job_id
+
+
+def _score_in_pool(questions, cached):
+    """score_interview() on the scoring process pool, rerun once if the pool broke."""
+    pool = _pool.get()
+    try:
+        return pool.submit(score_interview, questions, None, cached).result()
+    except BrokenProcessPool:
+        _pool.discard(pool)
+        return _pool.get().submit(score_interview, questions, None, cached).result()
+
+
+def _score_job(report, interview_id):
+    report('Scoring answers', 10)
+    interview = storage.get_interview(interview_id)
+    if not interview:
+        return {'missing': True}
+    scores, feedback, result = _score_in_pool(interview['questions'],
+                                              storage.get_answer_scores(interview_id))
+    storage.update_interview(interview_id, scores=scores, feedback=feedback, result=result)
+    return {'result': result, 'overall': scores['overall']}
+
+
+def status(interview):
+    """'done', 'scoring' or 'failed' for an interview's background scoring."""
+    if interview.get('result') != 'scoring':
+        return 'done'
+    job = jobs.get_status(interview['scoring_job']) if interview.get('scoring_job') else None
+    if job is None or job['status'] == 'failed':
+        return 'failed'
+    # 'done' means the scores were written after `interview` was read
+    return 'done' if job['status'] == 'done' else 'scoring'
+
+
+# ─────────────────────────────────────────────────────────────────
+# BATCH RE-SCORING
+# ─────────────────────────────────────────────────────────────────
+
+def rescore_all(batch_size=500, scorer=None, progress=None):
+    """
+    Re-score every submitted interview with the current scorer and formula.
+    progress(done_so_far) is called after each batch. Returns the number re-scored.
+    """
+    scorer = scorer or get_scorer()
+    total = 0
+    for batch in storage.iter_scored_interviews(batch_size):
+        answers = [[(q.get('answer') or '').strip() for q in questions] for _, questions in batch]
+        pairs = [(q['question'], a) for (_, questions), ans in zip(batch, answers)
+                 for q, a in zip(questions, ans) if a]
+        scored = iter(scorer.score_many(pairs))
+
+        updates = []
+        for (interview_id, questions), ans in zip(batch, answers):
+            per_question = [_breakdown(*(next(scored) if a else (0, 0)), a) for a in ans]
+            updates.append((interview_id, *summarize(questions, per_question)))
+        storage.save_scores(updates)
+        total += len(updates)
+        if progress:
+            progress(total)
+    return total
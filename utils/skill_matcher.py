@@ -0,0 +1,92 @@
+"""
+skill_matcher.py - Precompiled multi-pattern skill matcher
+
+Replaces "one re.search per skill" with a single scan of the text. All
+patterns are compiled into one alternation (longest first) inside a
+lookahead, so the scan visits every position once and reports the longest
+pattern starting there. Shorter patterns that start at the same position
+are necessarily string prefixes of that match; they are checked from a
+table precomputed at build time. The result is exactly the set of patterns
+a separate search per pattern would have found.
+"""
+import re
+
+
+def _is_word(text, i):
+    return 0 <= i < len(text) and (text[i].isalnum() or text[i] == '_')
+
+
+def _at_boundary(text, i):
+    """Same test as the regex \\b at position i."""
+    return _is_word(text, i - 1) != _is_word(text, i)
+
+
+class SkillMatcher:
+    """
+    Build once from (pattern, key, whole_word) triples, then call find(text).
+
+    whole_word=True  → pattern must match as r'\\bpattern\\b'
+    whole_word=False → plain substring match
+    """
+
+    def __init__(self, patterns):
+        self._whole_word = {}
+        self._keys = {}
+        self._key_order = []
+        for pattern, key, whole_word in patterns:
+            self._whole_word.setdefault(pattern, whole_word)
+            self._keys.setdefault(pattern, [])
+            if key not in self._keys[pattern]:
+                self._keys[pattern].append(key)
+            if key not in self._key_order:
+                self._key_order.append(key)
+
+        ordered = sorted(self._whole_word, key=len, reverse=True)
+        # Word-bounded patterns share the leading \b so each alternative starts
+        # with a literal (cheap to reject); substring patterns go in their own group.
+        words = [re.escape(p) for p in ordered if self._whole_word[p]]
+        subs = [re.escape(p) for p in ordered if not self._whole_word[p]]
+        branches = []
+        if words:
+            branches.append(r'(?=\b(' + '|'.join(words) + r')\b)')
+        if subs:
+            branches.append(r'(?=(' + '|'.join(subs) + r'))')
+        self._regex = re.compile('|'.join(branches) or r'(?!)')
+        self._subs_regex = re.compile(branches[-1]) if words and subs else None
+
+        self._prefixes = {
+            p: [q for q in ordered if len(q) < len(p) and p.startswith(q)]
+            for p in ordered
+        }
+
+    def _matches_at(self, text, pos, pattern):
+        if not self._whole_word[pattern]:
+            return True
+        return _at_boundary(text, pos) and _at_boundary(text, pos + len(pattern))
+
+    def find_patterns(self, text):
+        """Return the set of patterns occurring in text."""
+        found = set()
+        for m in self._regex.finditer(text):
+            pos = m.start()
+            pattern = m.group(m.lastindex)
+            found.add(pattern)
+            for shorter in self._prefixes[pattern]:
+                if shorter not in found and self._matches_at(text, pos, shorter):
+                    found.add(shorter)
+            # A word match at this position hides any substring match that
+            # starts here too; look for one explicitly.
+            if m.lastindex == 1 and self._subs_regex:
+                sub = self._subs_regex.match(text, pos)
+                if sub:
+                    found.add(sub.group(1))
+                    found.update(q for q in self._prefixes[sub.group(1)]
+                                 if not self._whole_word[q])
+        return found
+
+    def find(self, text):
+        """Return the keys whose patterns occur in text, in build order."""
+        keys = set()
+        for pattern in self.find_patterns(text):
+            keys.update(self._keys[pattern])
+        return [k for k in self._key_order if k in keys]
@@ -0,0 +1,953 @@
+"""
+storage.py - SQLite data store for users, candidates, interviews and answers
+
+Replaces the whole-file data.json load/save with per-entity reads and writes.
+Records are handed back in the same dict shape data.json used, so routes and
+templates keep working unchanged. Fields the schema has no column for are
+kept in an `extra` JSON column so nothing from the old file is lost.
+
+Safe under multi-worker gunicorn: writes run in BEGIN IMMEDIATE transactions,
+schema setup and the data.json import are serialised with a file lock, and
+candidates/interviews carry a `version` counter for optimistic checks.
+
+User and candidate-profile reads go through a small read-through cache that
+is dropped as soon as the database changes, so the role check in
+login_required and the route's own lookup cost one query between them.
+
+Autosaved answers are appended to `answer_journal` instead of rewriting the
+answers table; reads overlay the journal and compact_journal() folds it back.
+
+Dashboard figures (candidate/interview totals, each candidate's interview
+count, score sum and latest interview) are maintained by triggers, so every
+write path keeps them in step inside its own transaction and reading them is
+a single row. The admin panel pages, sorts and searches over these columns.
+"""
+import copy
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from utils.question_bank import question_key
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: single-process dev server only
+    FCNTL_AVAILABLE = False
+
+DB_PATH = os.environ.get('SMARTHIRE_DB', 'smarthire.db')
+
+_local = threading.local()
+
+CACHE_MAX_ENTRIES = 5000
+RESUME_CACHE_MAX_BYTES = 50 * 1024 * 1024
+JOURNAL_COMPACT_EVERY = 500  # appends between automatic compactions
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version)
+_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id            TEXT PRIMARY KEY,
+        name          TEXT NOT NULL,
+        email         TEXT NOT NULL,
+        password_hash TEXT NOT NULL,
+        role          TEXT NOT NULL,
+        created_at    TEXT,
+        extra         TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE TABLE IF NOT EXISTS candidates (
+        user_id         TEXT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+        resume_text     TEXT NOT NULL DEFAULT '',
+        resume_filename TEXT,
+        skills          TEXT NOT NULL DEFAULT '[]',
+        asked_questions TEXT NOT NULL DEFAULT '[]',
+        extra           TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE TABLE IF NOT EXISTS interviews (
+        id               TEXT PRIMARY KEY,
+        candidate_id     TEXT NOT NULL REFERENCES candidates(user_id) ON DELETE CASCADE,
+        position         INTEGER NOT NULL,
+        date             TEXT,
+        type             TEXT,
+        scores           TEXT NOT NULL DEFAULT '{}',
+        result           TEXT NOT NULL DEFAULT 'pending',
+        feedback         TEXT NOT NULL DEFAULT '',
+        duration_seconds INTEGER NOT NULL DEFAULT 0,
+        extra            TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE TABLE IF NOT EXISTS answers (
+        interview_id TEXT NOT NULL REFERENCES interviews(id) ON DELETE CASCADE,
+        q_index      INTEGER NOT NULL,
+        question     TEXT NOT NULL,
+        answer       TEXT NOT NULL DEFAULT '',
+        extra        TEXT NOT NULL DEFAULT '{}',
+        PRIMARY KEY (interview_id, q_index)
+    );
+    """,
+    """
+    ALTER TABLE candidates ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE interviews ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email);
+    CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_interviews_candidate
+        ON interviews(candidate_id, position);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS answer_journal (
+        seq          INTEGER PRIMARY KEY,
+        interview_id TEXT NOT NULL REFERENCES interviews(id) ON DELETE CASCADE,
+        q_index      INTEGER NOT NULL,
+        answer       TEXT NOT NULL,
+        saved_at     TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_journal_interview ON answer_journal(interview_id, seq);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id         TEXT PRIMARY KEY,
+        user_id    TEXT NOT NULL,
+        kind       TEXT NOT NULL,
+        status     TEXT NOT NULL DEFAULT 'queued',
+        stage      TEXT NOT NULL DEFAULT '',
+        progress   INTEGER NOT NULL DEFAULT 0,
+        output     TEXT NOT NULL DEFAULT '{}',
+        error      TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, created_at);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS resume_cache (
+        sha256    TEXT PRIMARY KEY,
+        version   TEXT NOT NULL,
+        text      TEXT NOT NULL,
+        output    TEXT NOT NULL,
+        size      INTEGER NOT NULL,
+        last_used TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_resume_cache_lru ON resume_cache(last_used);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS blobs (
+        sha256     TEXT PRIMARY KEY,
+        ext        TEXT NOT NULL,
+        size       INTEGER NOT NULL,
+        refcount   INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        touched_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs(refcount, touched_at);
+    ALTER TABLE candidates ADD COLUMN resume_blob TEXT REFERENCES blobs(sha256);
+    """,
+    """
+    ALTER TABLE candidates ADD COLUMN asked_bits TEXT;
+    ALTER TABLE candidates ADD COLUMN asked_bank TEXT;
+    """,
+    # Python step: full question texts in asked_questions become question keys
+    lambda conn: _migrate_asked_questions(conn),
+    """
+    ALTER TABLE interviews ADD COLUMN scoring_job TEXT;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS answer_scores (
+        interview_id  TEXT NOT NULL REFERENCES interviews(id) ON DELETE CASCADE,
+        q_index       INTEGER NOT NULL,
+        answer_hash   TEXT NOT NULL,
+        scorer        TEXT NOT NULL,
+        technical     REAL NOT NULL,
+        communication REAL NOT NULL,
+        PRIMARY KEY (interview_id, q_index)
+    );
+    """,
+    # Dashboard aggregates, kept current by triggers in the writing transaction
+    """
+    CREATE TABLE IF NOT EXISTS counters (
+        name  TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    );
+    ALTER TABLE candidates ADD COLUMN interview_count INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE candidates ADD COLUMN score_sum REAL NOT NULL DEFAULT 0;
+    INSERT OR REPLACE INTO counters (name, value)
+        SELECT 'candidates', COUNT(*) FROM candidates
+        UNION ALL SELECT 'interviews', COUNT(*) FROM interviews;
+    UPDATE candidates SET
+        interview_count = (SELECT COUNT(*) FROM interviews WHERE candidate_id = user_id),
+        score_sum = (SELECT TOTAL(json_extract(scores, '$.overall'))
+                     FROM interviews WHERE candidate_id = user_id);
+    CREATE TRIGGER IF NOT EXISTS trg_candidates_insert AFTER INSERT ON candidates BEGIN
+        UPDATE counters SET value = value + 1 WHERE name = 'candidates';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_candidates_delete AFTER DELETE ON candidates BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'candidates';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_interviews_insert AFTER INSERT ON interviews BEGIN
+        UPDATE counters SET value = value + 1 WHERE name = 'interviews';
+        UPDATE candidates SET interview_count = interview_count + 1,
+            score_sum = score_sum + COALESCE(json_extract(NEW.scores, '$.overall'), 0)
+            WHERE user_id = NEW.candidate_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_interviews_delete AFTER DELETE ON interviews BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'interviews';
+        UPDATE candidates SET interview_count = interview_count - 1,
+            score_sum = score_sum - COALESCE(json_extract(OLD.scores, '$.overall'), 0)
+            WHERE user_id = OLD.candidate_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_interviews_scores AFTER UPDATE OF scores ON interviews BEGIN
+        UPDATE candidates SET score_sum = score_sum
+            + COALESCE(json_extract(NEW.scores, '$.overall'), 0)
+            - COALESCE(json_extract(OLD.scores, '$.overall'), 0)
+            WHERE user_id = NEW.candidate_id;
+    END;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_interviews_date ON interviews(date, id);
+    """,
+    # Admin panel: each candidate's latest interview, kept current by triggers
+    """
+    ALTER TABLE candidates ADD COLUMN last_interview_id TEXT;
+    ALTER TABLE candidates ADD COLUMN last_score REAL;
+    ALTER TABLE candidates ADD COLUMN last_result TEXT;
+    ALTER TABLE candidates ADD COLUMN last_date TEXT;
+    UPDATE candidates SET (last_interview_id, last_score, last_result, last_date) = (
+        SELECT id, json_extract(scores, '$.overall'), result, date FROM interviews
+        WHERE candidate_id = user_id ORDER BY position DESC LIMIT 1);
+    CREATE INDEX IF NOT EXISTS idx_candidates_last_score ON candidates(last_score, user_id);
+    CREATE INDEX IF NOT EXISTS idx_candidates_last_date ON candidates(last_date, user_id);
+    CREATE INDEX IF NOT EXISTS idx_candidates_interview_count ON candidates(interview_count, user_id);
+    CREATE INDEX IF NOT EXISTS idx_users_name ON users(name COLLATE NOCASE);
+    CREATE TRIGGER IF NOT EXISTS trg_interviews_last_insert AFTER INSERT ON interviews BEGIN
+        UPDATE candidates SET last_interview_id = NEW.id,
+            last_score = json_extract(NEW.scores, '$.overall'),
+            last_result = NEW.result, last_date = NEW.date
+            WHERE user_id = NEW.candidate_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_interviews_last_update AFTER UPDATE OF scores, result ON interviews
+    BEGIN
+        UPDATE candidates SET last_score = json_extract(NEW.scores, '$.overall'),
+            last_result = NEW.result
+            WHERE user_id = NEW.candidate_id AND last_interview_id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_interviews_last_delete AFTER DELETE ON interviews BEGIN
+        UPDATE candidates SET (last_interview_id, last_score, last_result, last_date) = (
+            SELECT id, json_extract(scores, '$.overall'), result, date FROM interviews
+            WHERE candidate_id = OLD.candidate_id ORDER BY position DESC LIMIT 1)
+            WHERE user_id = OLD.candidate_id AND last_interview_id = OLD.id;
+    END;
+    """,
+    """
+    DROP INDEX IF EXISTS idx_users_role;
+    """,
+]
+
+_USER_FIELDS = ('id', 'name', 'email', 'password_hash', 'role', 'created_at')
+_CANDIDATE_FIELDS = ('user_id', 'resume_text', 'resume_filename', 'skills',
+                     'asked_questions', 'interviews')
+_INTERVIEW_FIELDS = ('id', 'date', 'type', 'questions', 'scores', 'result',
+                     'feedback', 'duration_seconds')
+_JSON_COLUMNS = ('skills', 'asked_questions', 'scores', 'output')
+
+
+class ConflictError(Exception):
+    """A record was changed by another request since it was read."""
+
+
+class DuplicateEmailError(Exception):
+    """A user with this email address already exists."""
+
+
+# ─────────────────────────────────────────────────────────────────
+# CONNECTION
+# ─────────────────────────────────────────────────────────────────
+
+def get_connection():
+    """Return this thread's connection, opening it on first use (and after a fork)."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+@contextmanager
+def file_lock(path=None):
+    """Cross-process exclusive lock (defaults to the database's lock file)."""
+    path = path or DB_PATH + '.lock'
+    with open(path, 'a') as f:
+        if FCNTL_AVAILABLE:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def init_db(path=None):
+    """Point the store at `path` (optional) and bring the schema up to date."""
+    global DB_PATH
+    if path and path != DB_PATH:
+        DB_PATH = path
+        _local.conn = None
+        _local.cache = None
+    with file_lock():
+        conn = get_connection()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for i, script in enumerate(_MIGRATIONS[version:], start=version + 1):
+            try:
+                if callable(script):
+                    conn.execute('BEGIN IMMEDIATE')
+                    script(conn)
+                    conn.execute(f'PRAGMA user_version = {i}')
+                    conn.execute('COMMIT')
+                else:
+                    conn.executescript(f'BEGIN IMMEDIATE; {script}; PRAGMA user_version = {i}; COMMIT;')
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+        _local.cache = None
+
+
+@contextmanager
+def transaction():
+    """Run the enclosed writes as one atomic unit."""
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+    _local.cache = None
+
+
+def is_empty():
+    """True when no user has been stored yet."""
+    return get_connection().execute('SELECT 1 FROM users LIMIT 1').fetchone() is None
+
+
+# ─────────────────────────────────────────────────────────────────
+# READ CACHE
+# ─────────────────────────────────────────────────────────────────
+# Parsed records are cached per connection. PRAGMA data_version changes
+# whenever another connection (thread or worker) commits, and our own
+# commits clear the cache in transaction(), so a hit is never stale.
+
+def _read_cache(conn):
+    version = conn.execute('PRAGMA data_version').fetchone()[0]
+    cache = getattr(_local, 'cache', None)
+    if cache is None or _local.cache_version != version or len(cache) > CACHE_MAX_ENTRIES:
+        cache = _local.cache = {}
+        _local.cache_version = version
+    return cache
+
+
+def _cached(key, load):
+    conn = get_connection()
+    if conn.in_transaction:  # may see our own uncommitted writes
+        return load()
+    cache = _read_cache(conn)
+    if key not in cache:
+        cache[key] = load()
+    return copy.deepcopy(cache[key])
+
+
+# ─────────────────────────────────────────────────────────────────
+# ROW <-> DICT HELPERS
+# ─────────────────────────────────────────────────────────────────
+
+def _split_extra(record, known):
+    return json.dumps({k: v for k, v in record.items() if k not in known})
+
+
+def _row_to_dict(row):
+    d = dict(row)
+    extra = json.loads(d.pop('extra', None) or '{}')
+    for col in _JSON_COLUMNS:
+        if col in d:
+            d[col] = json.loads(d[col])
+    d.update(extra)
+    return d
+
+
+def _user_from_row(row):
+    return _row_to_dict(row) if row else None
+
+
+def _load_questions(interview_id):
+    conn = get_connection()
+    rows = conn.execute(
+        'SELECT question, answer, extra FROM answers WHERE interview_id = ? ORDER BY q_index',
+        (interview_id,))
+    questions = [_row_to_dict(r) for r in rows]
+    # Overlay answers still sitting in the journal (latest entry wins)
+    for q_index, answer in conn.execute(
+            'SELECT q_index, answer FROM answer_journal WHERE interview_id = ? ORDER BY seq',
+            (interview_id,)):
+        questions[q_index]['answer'] = answer
+    return questions
+
+
+def _interview_from_row(row, with_questions=True):
+    iv = _row_to_dict(row)
+    iv.pop('candidate_id', None)
+    iv.pop('position', None)
+    if with_questions:
+        iv['questions'] = _load_questions(iv['id'])
+    return iv
+
+
+# ─────────────────────────────────────────────────────────────────
+# USERS
+# ─────────────────────────────────────────────────────────────────
+
+def get_user(user_id):
+    def load():
+        row = get_connection().execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+        return _user_from_row(row)
+    return _cached(('user', user_id), load)
+
+
+def get_user_by_email(email):
+    def load():
+        row = get_connection().execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        return _user_from_row(row)
+    return _cached(('email', email), load)
+
+
+def create_user(user):
+    """Insert a user. Raises DuplicateEmailError if the email is taken."""
+    with transaction() as conn:
+        try:
+            conn.execute(
+                'INSERT INTO users (id, name, email, password_hash, role, created_at, extra) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (user['id'], user['name'], user['email'], user['password_hash'],
+                 user['role'], user.get('created_at'), _split_extra(user, _USER_FIELDS)))
+        except sqlite3.IntegrityError as e:
+            if 'users.email' in str(e):
+                raise DuplicateEmailError(user['email']) from e
+            raise
+
+
+def delete_user(user_id):
+    """Delete a user together with their candidate profile, interviews and answers."""
+    with transaction() as conn:
+        set_resume_blob(user_id, None)
+        conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+
+
+# ─────────────────────────────────────────────────────────────────
+# CANDIDATES
+# ─────────────────────────────────────────────────────────────────
+
+def get_candidate(user_id, with_interviews=True):
+    def load():
+        row = get_connection().execute(
+            'SELECT * FROM candidates WHERE user_id = ?', (user_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+    candidate = _cached(('candidate', user_id), load)
+    if candidate and with_interviews:
+        candidate['interviews'] = list_interviews(user_id)
+    return candidate
+
+
+def create_candidate(candidate):
+    with transaction() as conn:
+        conn.execute(
+            'INSERT INTO candidates (user_id, resume_text, resume_filename, skills, '
+            'asked_questions, extra) VALUES (?, ?, ?, ?, ?, ?)',
+            (candidate['user_id'], candidate.get('resume_text', ''),
+             candidate.get('resume_filename'),
+             json.dumps(candidate.get('skills', [])),
+             json.dumps(candidate.get('asked_questions', [])),
+             _split_extra(candidate, _CANDIDATE_FIELDS)))
+        for iv in candidate.get('interviews', []):
+            add_interview(candidate['user_id'], iv)
+
+
+def update_candidate(user_id, expected_version=None, **fields):
+    """
+    Update the given candidate columns; unknown keys are merged into `extra`.
+    With `expected_version`, raises ConflictError if the row changed since it was read.
+    """
+    cols, params, extra = [], [], {}
+    for key, value in fields.items():
+        if key in ('resume_text', 'resume_filename', 'asked_bits', 'asked_bank'):
+            cols.append(f'{key} = ?')
+            params.append(value)
+        elif key in ('skills', 'asked_questions'):
+            cols.append(f'{key} = ?')
+            params.append(json.dumps(value))
+        else:
+            extra[key] = value
+    with transaction() as conn:
+        if extra:
+            row = conn.execute('SELECT extra FROM candidates WHERE user_id = ?',
+                               (user_id,)).fetchone()
+            if row:
+                merged = json.loads(row['extra'])
+                merged.update(extra)
+                cols.append('extra = ?')
+                params.append(json.dumps(merged))
+        if cols:
+            _versioned_update(conn, 'candidates', 'user_id', user_id, cols, params,
+                              expected_version)
+
+
+# Sort keys for list_candidate_page(), each backed by an index
+_CANDIDATE_SORTS = {
+    'name': 'u.name COLLATE NOCASE',
+    'score': 'c.last_score',
+    'date': 'c.last_date',
+    'interviews': 'c.interview_count',
+}
+
+
+def list_candidate_page(search=None, sort='date', descending=True, limit=50, offset=0):
+    """
+    One page of the admin candidate list, with each candidate's latest interview.
+    `search` matches the start of the name (any case) or email. Returns
+    (rows, total) where total counts every candidate matching the search.
+    """
+    if sort not in _CANDIDATE_SORTS:
+        raise ValueError(f'Unknown sort key: {sort}')
+    conn = get_connection()
+    where, params = '', []
+    if search:
+        # Prefix ranges instead of LIKE so the name and email indexes are used
+        where = ('WHERE (u.name COLLATE NOCASE >= ? AND u.name COLLATE NOCASE < ?) '
+                 'OR (u.email >= ? AND u.email < ?)')
+        params = [search, search + '\U0010ffff', search.lower(), search.lower() + '\U0010ffff']
+        total = conn.execute(
+            f'SELECT COUNT(*) FROM candidates c JOIN users u ON u.id = c.user_id {where}',
+            params).fetchone()[0]
+    else:
+        total = count_candidates()
+    order = 'DESC' if descending else 'ASC'
+    rows = conn.execute(
+        'SELECT c.user_id AS id, u.name, u.email, c.skills, c.interview_count, '
+        'c.last_interview_id, c.last_score, c.last_result '
+        f'FROM candidates c JOIN users u ON u.id = c.user_id {where} '
+        f'ORDER BY {_CANDIDATE_SORTS[sort]} {order}, c.user_id {order} LIMIT ? OFFSET ?',
+        (*params, limit, offset)).fetchall()
+    return [_row_to_dict(r) for r in rows], total
+
+
+def count_candidates():
+    return _counter('candidates')
+
+
+# ─────────────────────────────────────────────────────────────────
+# INTERVIEWS & ANSWERS
+# ─────────────────────────────────────────────────────────────────
+
+def list_interviews(candidate_id, with_questions=True):
+    """A candidate's interviews; without questions each carries `question_count` instead."""
+    count = '' if with_questions else (
+        ', (SELECT COUNT(*) FROM answers a WHERE a.interview_id = i.id) AS question_count')
+    rows = get_connection().execute(
+        f'SELECT i.*{count} FROM interviews i WHERE candidate_id = ? ORDER BY position',
+        (candidate_id,)).fetchall()
+    return [_interview_from_row(r, with_questions) for r in rows]
+
+
+def count_interviews():
+    return _counter('interviews')
+
+
+def _counter(name):
+    row = get_connection().execute('SELECT value FROM counters WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def get_interview(interview_id, candidate_id=None):
+    """Fetch one interview; restrict to `candidate_id`'s interviews when given."""
+    sql = 'SELECT * FROM interviews WHERE id = ?'
+    params = [interview_id]
+    if candidate_id is not None:
+        sql += ' AND candidate_id = ?'
+        params.append(candidate_id)
+    row = get_connection().execute(sql, params).fetchone()
+    return _interview_from_row(row) if row else None
+
+
+def locate_interview(interview_id):
+    """Return (candidate_id, position) for an interview, or (None, None)."""
+    row = get_connection().execute(
+        'SELECT candidate_id, position FROM interviews WHERE id = ?', (interview_id,)).fetchone()
+    return (row['candidate_id'], row['position']) if row else (None, None)
+
+
+def add_interview(candidate_id, interview):
+    with transaction() as conn:
+        position = conn.execute(
+            'SELECT COALESCE(MAX(position) + 1, 0) FROM interviews WHERE candidate_id = ?',
+            (candidate_id,)).fetchone()[0]
+        conn.execute(
+            'INSERT INTO interviews (id, candidate_id, position, date, type, scores, '
+            'result, feedback, duration_seconds, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (interview['id'], candidate_id, position, interview.get('date'),
+             interview.get('type'), json.dumps(interview.get('scores', {})),
+             interview.get('result', 'pending'), interview.get('feedback', ''),
+             interview.get('duration_seconds', 0),
+             _split_extra(interview, _INTERVIEW_FIELDS)))
+        conn.executemany(
+            'INSERT INTO answers (interview_id, q_index, question, answer, extra) '
+            'VALUES (?, ?, ?, ?, ?)',
+            [(interview['id'], i, q['question'], q.get('answer', ''),
+              _split_extra(q, ('question', 'answer')))
+             for i, q in enumerate(interview.get('questions', []))])
+
+
+def update_interview(interview_id, expected_version=None, **fields):
+    """
+    Update interview columns (scores, result, feedback, duration_seconds, scoring_job).
+    With `expected_version`, raises ConflictError if the row changed since it was read.
+    """
+    cols, params = [], []
+    for key, value in fields.items():
+        if key not in ('scores', 'result', 'feedback', 'duration_seconds', 'scoring_job'):
+            raise ValueError(f'Unknown interview field: {key}')
+        cols.append(f'{key} = ?')
+        params.append(json.dumps(value) if key == 'scores' else value)
+    if cols:
+        with transaction() as conn:
+            if expected_version is not None and conn.execute(
+                    'SELECT 1 FROM answer_journal WHERE interview_id = ? LIMIT 1',
+                    (interview_id,)).fetchone():
+                raise ConflictError(f'interviews record {interview_id} has uncompacted answers')
+            _versioned_update(conn, 'interviews', 'id', interview_id, cols, params,
+                              expected_version)
+
+
+def set_answers(interview_id, answers, scores=()):
+    """
+    Append several {q_index: answer} entries to the journal, and store their
+    precomputed `scores` (see put_answer_scores), in one transaction.
+    """
+    if not answers:
+        return
+    with transaction() as conn:
+        conn.executemany(
+            'INSERT INTO answer_journal (interview_id, q_index, answer) VALUES (?, ?, ?)',
+            [(interview_id, q_index, answer) for q_index, answer in answers.items()])
+        seq = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        if scores:
+            put_answer_scores(interview_id, scores)
+    if seq // JOURNAL_COMPACT_EVERY != (seq - len(answers)) // JOURNAL_COMPACT_EVERY:
+        compact_journal()
+
+
+def compact_journal(interview_id=None):
+    """
+    Fold journaled answers into the answers table (one interview, or all).
+    Bumps the version of every interview touched. Returns the number of entries folded.
+    """
+    with transaction() as conn:
+        sql = 'SELECT seq, interview_id, q_index, answer FROM answer_journal'
+        params = ()
+        if interview_id is not None:
+            sql += ' WHERE interview_id = ?'
+            params = (interview_id,)
+        rows = conn.execute(sql + ' ORDER BY seq', params).fetchall()
+        if not rows:
+            return 0
+        latest = {(r['interview_id'], r['q_index']): r['answer'] for r in rows}
+        conn.executemany(
+            'UPDATE answers SET answer = ? WHERE interview_id = ? AND q_index = ?',
+            [(answer, iv_id, q_index) for (iv_id, q_index), answer in latest.items()])
+        conn.executemany('UPDATE interviews SET version = version + 1 WHERE id = ?',
+                         [(iv_id,) for iv_id in {iv_id for iv_id, _ in latest}])
+        conn.executemany('DELETE FROM answer_journal WHERE seq = ?',
+                         [(r['seq'],) for r in rows])
+    return len(rows)
+
+
+def get_question_texts(interview_id, q_indexes):
+    """{q_index: question text} for the given questions of an interview."""
+    marks = ', '.join('?' * len(q_indexes))
+    return {r[0]: r[1] for r in get_connection().execute(
+        f'SELECT q_index, question FROM answers WHERE interview_id = ? AND q_index IN ({marks})',
+        (interview_id, *q_indexes))}
+
+
+def get_answer_scores(interview_id):
+    """Per-question scores computed at autosave time, as {q_index: row}."""
+    return {r['q_index']: dict(r) for r in get_connection().execute(
+        'SELECT q_index, answer_hash, scorer, technical, communication FROM answer_scores '
+        'WHERE interview_id = ?', (interview_id,))}
+
+
+def put_answer_scores(interview_id, rows):
+    """Store [(q_index, answer_hash, scorer, technical, communication)]."""
+    with transaction() as conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO answer_scores (interview_id, q_index, answer_hash, scorer, '
+            'technical, communication) VALUES (?, ?, ?, ?, ?, ?)',
+            [(interview_id, *row) for row in rows])
+
+
+def iter_scored_interviews(batch_size=500):
+    """
+    Stream submitted (scored) interviews as lists of (interview_id, questions),
+    batch_size interviews at a time, without loading the whole table.
+    Their answers were compacted at submit, so the journal is not consulted.
+    """
+    conn = get_connection()
+    last_id = ''
+    while True:
+        ids = [r[0] for r in conn.execute(
+            "SELECT id FROM interviews WHERE id > ? AND result IN ('selected', 'rejected') "
+            'ORDER BY id LIMIT ?', (last_id, batch_size))]
+        if not ids:
+            return
+        questions = {iv_id: [] for iv_id in ids}
+        marks = ', '.join('?' * len(ids))
+        for r in conn.execute(
+                f'SELECT interview_id, question, answer FROM answers '
+                f'WHERE interview_id IN ({marks}) ORDER BY interview_id, q_index', ids):
+            questions[r[0]].append({'question': r[1], 'answer': r[2]})
+        yield list(questions.items())
+        last_id = ids[-1]
+
+
+def iter_export_rows(date_from=None, date_to=None, result=None, min_score=None,
+                     max_score=None, skill=None, after=None, batch_size=1000):
+    """
+    Stream interviews joined with their candidate's name and email, ordered by
+    (date, id), in batches of `batch_size` rows. Filters are optional; `after`
+    is a (date, id) pair to resume after. Each batch is its own short query,
+    so memory stays bounded and no read transaction is held open.
+    """
+    where, params = [], []
+    if date_from:
+        where.append('i.date >= ?')
+        params.append(date_from)
+    if date_to:
+        where.append('i.date < ?')
+        params.append(date_to)
+    if result:
+        where.append('i.result = ?')
+        params.append(result)
+    if min_score is not None:
+        where.append("json_extract(i.scores, '$.overall') >= ?")
+        params.append(min_score)
+    if max_score is not None:
+        where.append("json_extract(i.scores, '$.overall') <= ?")
+        params.append(max_score)
+    if skill:
+        where.append('EXISTS (SELECT 1 FROM json_each(c.skills) WHERE value = ?)')
+        params.append(skill)
+    sql = ('SELECT i.id, i.date, i.result, i.duration_seconds, '
+           "json_extract(i.scores, '$.overall') AS score, u.name, u.email "
+           'FROM interviews i JOIN candidates c ON c.user_id = i.candidate_id '
+           'JOIN users u ON u.id = i.candidate_id '
+           'WHERE (i.date, i.id) > (?, ?)')
+    if where:
+        sql += ' AND ' + ' AND '.join(where)
+    sql += ' ORDER BY i.date, i.id LIMIT ?'
+    conn = get_connection()
+    last = tuple(after) if after else ('', '')
+    while True:
+        rows = conn.execute(sql, (*last, *params, batch_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        last = (rows[-1]['date'], rows[-1]['id'])
+
+
+def save_scores(updates):
+    """Write [(interview_id, scores, feedback, result)] in one transaction."""
+    with transaction() as conn:
+        conn.executemany(
+            'UPDATE interviews SET scores = ?, feedback = ?, result = ?, version = version + 1 '
+            'WHERE id = ?',
+            [(json.dumps(scores), feedback, result, iv_id)
+             for iv_id, scores, feedback, result in updates])
+
+
+def _versioned_update(conn, table, key, key_value, cols, params, expected_version):
+    sql = f'UPDATE {table} SET {", ".join(cols)}, version = version + 1 WHERE {key} = ?'
+    params = [*params, key_value]
+    if expected_version is not None:
+        sql += ' AND version = ?'
+        params.append(expected_version)
+    cur = conn.execute(sql, params)
+    if expected_version is not None and cur.rowcount == 0:
+        raise ConflictError(f'{table} record {key_value} was modified concurrently')
+
+
+# ─────────────────────────────────────────────────────────────────
+# BACKGROUND JOBS (see utils/jobs.py)
+# ─────────────────────────────────────────────────────────────────
+
+def create_job(job_id, user_id, kind):
+    now = datetime.datetime.now().isoformat()
+    with transaction() as conn:
+        conn.execute(
+            'INSERT INTO jobs (id, user_id, kind, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            (job_id, user_id, kind, now, now))
+
+
+def update_job(job_id, **fields):
+    """Update status, stage, progress, output or error of a job."""
+    cols, params = [], []
+    for key, value in fields.items():
+        if key not in ('status', 'stage', 'progress', 'output', 'error'):
+            raise ValueError(f'Unknown job field: {key}')
+        cols.append(f'{key} = ?')
+        params.append(json.dumps(value) if key == 'output' else value)
+    cols.append('updated_at = ?')
+    params.append(datetime.datetime.now().isoformat())
+    with transaction() as conn:
+        conn.execute(f'UPDATE jobs SET {", ".join(cols)} WHERE id = ?', (*params, job_id))
+
+
+def get_job(job_id):
+    row = get_connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+# ─────────────────────────────────────────────────────────────────
+# PARSED RESUME CACHE (keyed on file content hash)
+# ─────────────────────────────────────────────────────────────────
+
+def get_cached_resume(sha256, version):
+    """Cached parse result for this file content, or None (also None if built by another version)."""
+    with transaction() as conn:
+        row = conn.execute('SELECT * FROM resume_cache WHERE sha256 = ?', (sha256,)).fetchone()
+        if not row:
+            return None
+        if row['version'] != version:
+            conn.execute('DELETE FROM resume_cache WHERE sha256 = ?', (sha256,))
+            return None
+        conn.execute('UPDATE resume_cache SET last_used = ? WHERE sha256 = ?',
+                     (datetime.datetime.now().isoformat(), sha256))
+    return _row_to_dict(row)
+
+
+def put_cached_resume(sha256, version, text, output, max_bytes=RESUME_CACHE_MAX_BYTES):
+    """Store a parse result, then evict least recently used entries beyond max_bytes."""
+    output = json.dumps(output)
+    size = len(text) + len(output)
+    with transaction() as conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO resume_cache (sha256, version, text, output, size, last_used) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (sha256, version, text, output, size, datetime.datetime.now().isoformat()))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM resume_cache').fetchone()[0]
+        if total > max_bytes:
+            evict = []
+            for row in conn.execute('SELECT sha256, size FROM resume_cache ORDER BY last_used'):
+                if total <= max_bytes:
+                    break
+                evict.append((row['sha256'],))
+                total -= row['size']
+            conn.executemany('DELETE FROM resume_cache WHERE sha256 = ?', evict)
+
+
+# ─────────────────────────────────────────────────────────────────
+# UPLOADED FILE BLOBS (see utils/blobstore.py)
+# ─────────────────────────────────────────────────────────────────
+
+def touch_blob(sha256, ext, size):
+    """
+    Register a blob (or refresh it) so the sweeper leaves it alone for a grace period.
+    Returns the blob's stored extension: the first upload's, if the content is known.
+    """
+    now = datetime.datetime.now().isoformat()
+    with transaction() as conn:
+        conn.execute(
+            'INSERT INTO blobs (sha256, ext, size, created_at, touched_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(sha256) DO UPDATE SET touched_at = excluded.touched_at',
+            (sha256, ext, size, now, now))
+        return conn.execute('SELECT ext FROM blobs WHERE sha256 = ?', (sha256,)).fetchone()[0]
+
+
+def set_resume_blob(user_id, sha256):
+    """Point a candidate at a resume blob (or None), moving the reference counts."""
+    now = datetime.datetime.now().isoformat()
+    with transaction() as conn:
+        row = conn.execute('SELECT resume_blob FROM candidates WHERE user_id = ?',
+                           (user_id,)).fetchone()
+        if not row or row['resume_blob'] == sha256:
+            return
+        conn.execute('UPDATE candidates SET resume_blob = ? WHERE user_id = ?', (sha256, user_id))
+        if row['resume_blob']:
+            conn.execute('UPDATE blobs SET refcount = refcount - 1, touched_at = ? WHERE sha256 = ?',
+                         (now, row['resume_blob']))
+        if sha256:
+            conn.execute('UPDATE blobs SET refcount = refcount + 1 WHERE sha256 = ?', (sha256,))
+
+
+def list_unreferenced_blobs(older_than):
+    """Blobs nobody references that were last touched before `older_than` (ISO time)."""
+    return get_connection().execute(
+        'SELECT sha256, ext FROM blobs WHERE refcount = 0 AND touched_at < ?',
+        (older_than,)).fetchall()
+
+
+def delete_blob(sha256, older_than):
+    """Drop a blob record if it is still unreferenced and stale. Returns True if deleted."""
+    with transaction() as conn:
+        cur = conn.execute(
+            'DELETE FROM blobs WHERE sha256 = ? AND refcount = 0 AND touched_at < ?',
+            (sha256, older_than))
+    return cur.rowcount > 0
+
+
+def _migrate_asked_questions(conn):
+    rows = conn.execute('SELECT user_id, asked_questions FROM candidates').fetchall()
+    for row in rows:
+        keys = [question_key(q) for q in json.loads(row['asked_questions'])]
+        conn.execute('UPDATE candidates SET asked_questions = ?, asked_bits = NULL '
+                     'WHERE user_id = ?', (json.dumps(keys), row['user_id']))
+
+
+# ─────────────────────────────────────────────────────────────────
+# MIGRATION FROM data.json
+# ─────────────────────────────────────────────────────────────────
+
+def migrate_from_json(json_path):
+    """
+    One-shot import of the legacy data.json layout.
+    Returns (users, candidates, interviews) counts imported.
+    """
+    with open(json_path, 'r') as f:
+        data = json.load(f)  # a corrupt file must fail loudly, never import as empty
+
+    users = data.get('users', {})
+    candidates = data.get('candidates', {})
+    n_interviews = 0
+    with transaction():
+        for user in users.values():
+            create_user(user)
+        for user_id, cand in candidates.items():
+            if user_id not in users:
+                print(f"⚠️ Skipping candidate {user_id}: no matching user")
+                continue
+            # data.json kept full question texts; the store keeps question keys
+            cand = dict(cand, user_id=user_id,
+                        asked_questions=[question_key(q) for q in cand.get('asked_questions', [])])
+            create_candidate(cand)
+            n_interviews += len(cand.get('interviews', []))
+    return len(users), len(candidates), n_interviews